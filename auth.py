@@ -8,6 +8,7 @@ import hashlib
 import hmac
 import json
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any, Set
 from dataclasses import dataclass, field
@@ -119,6 +120,8 @@ class AuthConfig:
     ldap_base_dn: Optional[str] = None
     ldap_bind_user: Optional[str] = None
     ldap_bind_password: Optional[str] = None
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_size: int = 1000
 
 
 class JWTManager:
@@ -568,6 +571,9 @@ class AuthSystem:
         self.security_middleware = SecurityMiddleware(config)
         self.ldap_authenticator = LDAPAuthenticator(config)
         
+        # slack_user_id -> (monotonic time cached, UserContext), least recently used first
+        self._user_cache: OrderedDict = OrderedDict()
+        
     async def initialize(self):
         """Initialize the authentication system"""
         await self.session_manager.initialize()
@@ -584,7 +590,20 @@ class AuthSystem:
         await self.session_manager.close()
     
     async def authenticate_user(self, slack_user_id: str) -> Optional[UserContext]:
-        """Authenticate user by Slack user ID"""
+        """Authenticate user by Slack user ID
+        
+        Successful lookups are cached for user_cache_ttl_seconds, reusing the
+        mapping and session instead of fetching and creating them per message.
+        The cache holds at most user_cache_max_size users, evicting the least
+        recently used.
+        """
+        cached = self._user_cache.get(slack_user_id)
+        if cached:
+            if time.monotonic() - cached[0] < self.config.user_cache_ttl_seconds:
+                self._user_cache.move_to_end(slack_user_id)
+                return cached[1]
+            del self._user_cache[slack_user_id]
+        
         # Get user mapping
         mapping = await self.user_mapper.get_mapping(slack_user_id)
         if not mapping:
@@ -606,8 +625,15 @@ class AuthSystem:
         session_id = await self.session_manager.create_session(user_context)
         user_context.session_id = session_id
         
+        self._user_cache[slack_user_id] = (time.monotonic(), user_context)
+        if len(self._user_cache) > self.config.user_cache_max_size:
+            self._user_cache.popitem(last=False)
         return user_context
     
+    def invalidate_user(self, slack_user_id: str):
+        """Drop a cached user context, e.g. after its mapping changes"""
+        self._user_cache.pop(slack_user_id, None)
+    
     async def create_user_mapping(
         self,
         slack_user_id: str,
@@ -643,6 +669,7 @@ class AuthSystem:
             roles=role_names,
             permissions=list(all_permissions)
         )
+        self.invalidate_user(slack_user_id)
 
 
 # Decorators for permission checking
@@ -16,6 +16,9 @@ import structlog
 # Initialize logger
 logger = structlog.get_logger()
 
+# Matches any user mention token, e.g. <@U012ABCDEF>
+_MENTION_RE = re.compile(r"<@[A-Z0-9]+>")
+
 # Get tokens
 BOT_TOKEN = os.environ["SLACK_BOT_TOKEN"]
 APP_TOKEN = os.environ["SLACK_APP_TOKEN"]
@@ -50,7 +53,7 @@ async def mention_handler(event, say):
     print(f"📨 Got app_mention event: {event}")
     
     user = event["user"]
-    text = re.sub(r'<@[A-Z0-9]+>', '', event.get("text", "")).strip()
+    text = _MENTION_RE.sub("", event.get("text", "")).strip()
     
     # Send initial "thinking" message
     thinking_msg = await say(
@@ -4,6 +4,7 @@ Handles environment variables and application settings
 """
 
 import os
+import orjson
 from typing import Optional, List
 from pydantic import Field, validator
 from pydantic_settings import BaseSettings
@@ -165,10 +166,11 @@ class Settings(BaseSettings):
         """Get database configuration for connection pool"""
         return {
             "dsn": self.database_url,
-            "min_size": 1,
+            "min_size": 2,
             "max_size": self.database_pool_size,
             "max_queries": 50000,
             "max_inactive_connection_lifetime": 300,
+            "command_timeout": 30,
         }
     
     def get_redis_config(self) -> dict:
@@ -244,6 +246,11 @@ def validate_required_settings():
         )
 
 
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    """JSON serializer for structlog's renderer backed by orjson"""
+    return orjson.dumps(obj, default=default).decode()
+
+
 def setup_logging():
     """Setup logging configuration based on settings"""
     import logging
@@ -267,7 +274,7 @@ def setup_logging():
     ]
     
     if settings.log_format == "json":
-        processors.append(structlog.processors.JSONRenderer())
+        processors.append(structlog.processors.JSONRenderer(serializer=_orjson_dumps))
     else:
         processors.append(structlog.dev.ConsoleRenderer())
     
@@ -4,7 +4,8 @@ Handles user sessions, query history, and audit logging
 """
 
 import asyncio
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 import json
@@ -27,6 +28,9 @@ settings = get_settings()
 
 Base = declarative_base()
 
+# Bulk history saves at or above this many rows use COPY instead of executemany
+BULK_COPY_THRESHOLD = 50
+
 
 class UserSession(Base):
     """User session storage"""
@@ -89,7 +93,7 @@ class QueryHistory(Base):
     
     # Indexes
     __table_args__ = (
-        Index("idx_query_history_user", "user_id"),
+        Index("idx_query_history_user_created", "user_id", created_at.desc()),
         Index("idx_query_history_slack_user", "slack_user_id"),
         Index("idx_query_history_channel", "channel_id"),
         Index("idx_query_history_created", "created_at"),
@@ -186,7 +190,7 @@ class AuditLog(Base):
     # Indexes
     __table_args__ = (
         Index("idx_audit_logs_event_type", "event_type"),
-        Index("idx_audit_logs_user", "user_id"),
+        Index("idx_audit_logs_user_type_created", "user_id", "event_type", created_at.desc()),
         Index("idx_audit_logs_slack_user", "slack_user_id"),
         Index("idx_audit_logs_created", "created_at"),
         Index("idx_audit_logs_result", "result"),
@@ -197,10 +201,49 @@ class AuditLog(Base):
 class DatabaseConfig:
     """Database configuration"""
     dsn: str
-    min_size: int = 1
+    min_size: int = 2
     max_size: int = 10
     max_queries: int = 50000
     max_inactive_connection_lifetime: float = 300.0
+    command_timeout: float = 30.0
+    statement_cache_size: int = 100
+    max_cached_statement_lifetime: int = 300
+    max_cacheable_statement_size: int = 1024 * 15
+    application_name: str = "goose-slackbot"
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # Binary jsonb wire format is a version byte followed by the JSON text
+    return b"\x01" + json.dumps(value).encode()
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return json.loads(data[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode json/jsonb columns to Python objects on every pooled connection
+    
+    jsonb uses the binary format so it also works with copy_records_to_table.
+    """
+    await conn.set_type_codec(
+        "json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+    )
+    await conn.set_type_codec(
+        "jsonb", encoder=_encode_jsonb, decoder=_decode_jsonb,
+        schema="pg_catalog", format="binary"
+    )
+
+
+class _HeldConnectionPool:
+    """Pool stand-in that hands every caller the same already-acquired connection"""
+    
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+    
+    @asynccontextmanager
+    async def acquire(self):
+        yield self._conn
 
 
 class DatabaseManager:
@@ -219,6 +262,12 @@ class DatabaseManager:
                 max_size=self.config.max_size,
                 max_queries=self.config.max_queries,
                 max_inactive_connection_lifetime=self.config.max_inactive_connection_lifetime,
+                command_timeout=self.config.command_timeout,
+                statement_cache_size=self.config.statement_cache_size,
+                max_cached_statement_lifetime=self.config.max_cached_statement_lifetime,
+                max_cacheable_statement_size=self.config.max_cacheable_statement_size,
+                server_settings={"application_name": self.config.application_name},
+                init=_init_connection,
             )
             logger.info("Database connection pool initialized")
             
@@ -230,6 +279,18 @@ class DatabaseManager:
             logger.error("Failed to initialize database", error=str(e))
             raise
     
+    @asynccontextmanager
+    async def connection(self):
+        """Hold one pooled connection for a run of sequential calls
+        
+        Yields a DatabaseManager bound to that connection, so repositories built
+        on it reuse it instead of going back to the pool for every statement.
+        """
+        async with self.pool.acquire() as conn:
+            bound = DatabaseManager(self.config)
+            bound.pool = _HeldConnectionPool(conn)
+            yield bound
+    
     async def close(self):
         """Close database connection pool"""
         if self.pool:
@@ -279,7 +340,7 @@ class UserSessionRepository:
             INSERT INTO user_sessions (id, user_id, slack_user_id, channel_id, context)
             VALUES ($1, $2, $3, $4, $5)
             """,
-            session_id, user_id, slack_user_id, channel_id, json.dumps(context)
+            session_id, user_id, slack_user_id, channel_id, context
         )
         
         logger.info("Created user session", session_id=session_id, user_id=user_id)
@@ -303,9 +364,14 @@ class UserSessionRepository:
             return dict(row)
         return None
     
-    async def update_session_activity(self, session_id: str, context: Dict[str, Any] = None):
-        """Update session activity and context"""
-        now = datetime.now(timezone.utc)
+    async def update_session_activity(
+        self,
+        session_id: str,
+        context: Dict[str, Any] = None,
+        now: datetime = None
+    ):
+        """Update session activity and context, stamped with `now` (default: current UTC time)"""
+        now = now or datetime.now(timezone.utc)
         
         if context:
             await self.db.execute_command(
@@ -314,14 +380,14 @@ class UserSessionRepository:
                 SET last_activity = $1, updated_at = $1, context = $2
                 WHERE id = $3
                 """,
-                now, json.dumps(context), session_id
+                now, context, session_id
             )
         else:
             await self.db.execute_command(
                 """
                 UPDATE user_sessions 
                 SET last_activity = $1, updated_at = $1
-                WHERE id = $3
+                WHERE id = $2
                 """,
                 now, session_id
             )
@@ -348,6 +414,49 @@ class QueryHistoryRepository:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
+    _HISTORY_COLUMNS = [
+        "session_id", "user_id", "slack_user_id", "channel_id", "query_id",
+        "original_question", "generated_sql", "query_result", "execution_time",
+        "row_count", "success", "error_message", "table_metadata", "similar_queries",
+        "experts", "similar_tables"
+    ]
+    
+    _INSERT_HISTORY_SQL = """
+        INSERT INTO query_history (
+            session_id, user_id, slack_user_id, channel_id, query_id,
+            original_question, generated_sql, query_result, execution_time,
+            row_count, success, error_message, table_metadata, similar_queries,
+            experts, similar_tables
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+    """
+    
+    @staticmethod
+    def _history_record(
+        session_id: str,
+        user_id: str,
+        slack_user_id: str,
+        channel_id: str,
+        query_id: str,
+        original_question: str,
+        generated_sql: str = None,
+        query_result: Dict[str, Any] = None,
+        execution_time: float = None,
+        row_count: int = 0,
+        success: bool = False,
+        error_message: str = None,
+        metadata: Dict[str, Any] = None
+    ) -> tuple:
+        """Build a query_history row in _HISTORY_COLUMNS order"""
+        return (
+            session_id, user_id, slack_user_id, channel_id, query_id,
+            original_question, generated_sql, query_result or None,
+            execution_time, row_count, success, error_message,
+            metadata.get("table_search", {}) if metadata else None,
+            metadata.get("similar_queries", {}) if metadata else None,
+            metadata.get("experts", []) if metadata else None,
+            metadata.get("similar_tables", []) if metadata else None
+        )
+    
     async def save_query(
         self,
         session_id: str,
@@ -367,28 +476,63 @@ class QueryHistoryRepository:
         """Save query execution to history"""
         
         await self.db.execute_command(
-            """
-            INSERT INTO query_history (
+            self._INSERT_HISTORY_SQL,
+            *self._history_record(
                 session_id, user_id, slack_user_id, channel_id, query_id,
                 original_question, generated_sql, query_result, execution_time,
-                row_count, success, error_message, table_metadata, similar_queries,
-                experts, similar_tables
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
-            """,
-            session_id, user_id, slack_user_id, channel_id, query_id,
-            original_question, generated_sql, 
-            json.dumps(query_result) if query_result else None,
-            execution_time, row_count, success, error_message,
-            json.dumps(metadata.get("table_search", {})) if metadata else None,
-            json.dumps(metadata.get("similar_queries", {})) if metadata else None,
-            json.dumps(metadata.get("experts", [])) if metadata else None,
-            json.dumps(metadata.get("similar_tables", [])) if metadata else None
+                row_count, success, error_message, metadata
+            )
         )
         
         logger.info("Saved query to history", query_id=query_id, user_id=user_id)
     
-    async def get_user_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent query history for user"""
+    async def save_queries_bulk(self, queries: List[Dict[str, Any]]):
+        """Save many query executions in one round-trip
+        
+        Each item takes the same keyword arguments as save_query.
+        """
+        if not queries:
+            return
+        
+        records = [self._history_record(**query) for query in queries]
+        
+        async with self.db.pool.acquire() as conn:
+            if len(records) < BULK_COPY_THRESHOLD:
+                await conn.executemany(self._INSERT_HISTORY_SQL, records)
+            else:
+                await conn.copy_records_to_table(
+                    "query_history",
+                    records=records,
+                    columns=self._HISTORY_COLUMNS
+                )
+        
+        logger.info("Saved queries to history", count=len(records))
+    
+    async def count_for_user(self, user_id: str) -> int:
+        """Count query history rows for user"""
+        return await self.db.execute_scalar(
+            "SELECT COUNT(*) FROM query_history WHERE user_id = $1",
+            user_id
+        )
+    
+    async def get_query_by_id(self, query_id: str) -> Optional[asyncpg.Record]:
+        """Get a single history entry by query ID"""
+        return await self.db.execute_one(
+            """
+            SELECT query_id, user_id, original_question, generated_sql, success,
+                   execution_time, row_count, error_message, created_at
+            FROM query_history
+            WHERE query_id = $1
+            """,
+            query_id
+        )
+    
+    async def get_user_history(self, user_id: str, limit: int = 10) -> List[asyncpg.Record]:
+        """Get recent query history for user
+        
+        Rows are returned as asyncpg Records, which support the same
+        row["column"] access as dicts without copying each row.
+        """
         rows = await self.db.execute_query(
             """
             SELECT query_id, original_question, generated_sql, success, 
@@ -401,7 +545,7 @@ class QueryHistoryRepository:
             user_id, limit
         )
         
-        return [dict(row) for row in rows]
+        return rows
     
     async def get_popular_queries(self, days: int = 7, limit: int = 10) -> List[Dict[str, Any]]:
         """Get popular queries from recent days"""
@@ -458,7 +602,7 @@ class UserMappingRepository:
                 updated_at = EXCLUDED.updated_at
             """,
             slack_user_id, internal_user_id, ldap_id, email, full_name,
-            json.dumps(roles or []), json.dumps(permissions or []),
+            roles or [], permissions or [],
             datetime.now(timezone.utc)
         )
         
@@ -478,9 +622,9 @@ class UserMappingRepository:
         
         if row:
             mapping = dict(row)
-            mapping["roles"] = json.loads(mapping["roles"] or "[]")
-            mapping["permissions"] = json.loads(mapping["permissions"] or "[]")
-            mapping["user_metadata"] = json.loads(mapping["user_metadata"] or "{}")
+            mapping["roles"] = mapping["roles"] or []
+            mapping["permissions"] = mapping["permissions"] or []
+            mapping["user_metadata"] = mapping["user_metadata"] or {}
             return mapping
         
         return None
@@ -489,8 +633,43 @@ class UserMappingRepository:
 class AuditLogRepository:
     """Repository for audit log operations"""
     
+    _INSERT_AUDIT_SQL = """
+        INSERT INTO audit_logs (
+            event_type, user_id, slack_user_id, channel_id, action,
+            resource, result, ip_address, user_agent, request_id,
+            session_id, event_data, error_message
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+    """
+    
+    # Upper bound on events held back by failed flushes
+    MAX_PENDING_EVENTS = 1000
+    
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        self.pending: List[tuple] = []
+    
+    @staticmethod
+    def _audit_record(
+        event_type: str,
+        user_id: str,
+        action: str,
+        result: str = "success",
+        slack_user_id: str = None,
+        channel_id: str = None,
+        resource: str = None,
+        ip_address: str = None,
+        user_agent: str = None,
+        request_id: str = None,
+        session_id: str = None,
+        event_data: Dict[str, Any] = None,
+        error_message: str = None
+    ) -> tuple:
+        """Build an audit_logs row in _INSERT_AUDIT_SQL parameter order"""
+        return (
+            event_type, user_id, slack_user_id, channel_id, action,
+            resource, result, ip_address, user_agent, request_id,
+            session_id, event_data or {}, error_message
+        )
     
     async def log_event(
         self,
@@ -511,17 +690,55 @@ class AuditLogRepository:
         """Log an audit event"""
         
         await self.db.execute_command(
-            """
-            INSERT INTO audit_logs (
-                event_type, user_id, slack_user_id, channel_id, action,
-                resource, result, ip_address, user_agent, request_id,
-                session_id, event_data, error_message
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-            """,
-            event_type, user_id, slack_user_id, channel_id, action,
-            resource, result, ip_address, user_agent, request_id,
-            session_id, json.dumps(event_data or {}), error_message
+            self._INSERT_AUDIT_SQL,
+            *self._audit_record(
+                event_type, user_id, action, result, slack_user_id, channel_id,
+                resource, ip_address, user_agent, request_id, session_id,
+                event_data, error_message
+            )
         )
+    
+    def buffer_event(self, **event):
+        """Queue an audit event for the next flush(); takes log_event's arguments"""
+        self.pending.append(self._audit_record(**event))
+    
+    async def flush(self):
+        """Write all buffered audit events in one round-trip"""
+        if not self.pending:
+            return
+        
+        # Swap before awaiting so events buffered meanwhile wait for the next flush
+        records, self.pending = self.pending, []
+        
+        try:
+            async with self.db.pool.acquire() as conn:
+                try:
+                    async with conn.transaction():
+                        await conn.executemany(self._INSERT_AUDIT_SQL, records)
+                except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError):
+                    # A bad row fails the whole batch; write row by row and drop the bad ones
+                    await self._insert_each(conn, records)
+        except Exception:
+            # Requeue ahead of anything buffered meanwhile so a retry keeps the order,
+            # keeping only the newest events if the database stays unreachable
+            self.pending[:0] = records
+            overflow = len(self.pending) - self.MAX_PENDING_EVENTS
+            if overflow > 0:
+                del self.pending[:overflow]
+                logger.warning("Dropped unwritten audit events", count=overflow)
+            raise
+    
+    async def _insert_each(self, conn, records: List[tuple]):
+        """Insert records one at a time, logging and skipping any the database rejects"""
+        for record in records:
+            try:
+                async with conn.transaction():
+                    await conn.execute(self._INSERT_AUDIT_SQL, *record)
+            except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError) as e:
+                logger.error(
+                    "Dropped invalid audit event",
+                    event_type=record[0], action=record[4], error=str(e)
+                )
 
 
 # Database initialization
@@ -621,11 +838,11 @@ async def create_database_schema(db_manager: DatabaseManager):
     CREATE INDEX IF NOT EXISTS idx_user_sessions_slack_user ON user_sessions(slack_user_id);
     CREATE INDEX IF NOT EXISTS idx_user_sessions_activity ON user_sessions(last_activity);
     
-    CREATE INDEX IF NOT EXISTS idx_query_history_user ON query_history(user_id);
     CREATE INDEX IF NOT EXISTS idx_query_history_slack_user ON query_history(slack_user_id);
     CREATE INDEX IF NOT EXISTS idx_query_history_channel ON query_history(channel_id);
     CREATE INDEX IF NOT EXISTS idx_query_history_created ON query_history(created_at);
     CREATE INDEX IF NOT EXISTS idx_query_history_success ON query_history(success);
+    CREATE INDEX IF NOT EXISTS idx_query_history_user_created ON query_history(user_id, created_at DESC);
     
     CREATE INDEX IF NOT EXISTS idx_user_mappings_internal ON user_mappings(internal_user_id);
     CREATE INDEX IF NOT EXISTS idx_user_mappings_ldap ON user_mappings(ldap_id);
@@ -636,10 +853,10 @@ async def create_database_schema(db_manager: DatabaseManager):
     CREATE INDEX IF NOT EXISTS idx_query_cache_accessed ON query_cache(last_accessed);
     
     CREATE INDEX IF NOT EXISTS idx_audit_logs_event_type ON audit_logs(event_type);
-    CREATE INDEX IF NOT EXISTS idx_audit_logs_user ON audit_logs(user_id);
     CREATE INDEX IF NOT EXISTS idx_audit_logs_slack_user ON audit_logs(slack_user_id);
     CREATE INDEX IF NOT EXISTS idx_audit_logs_created ON audit_logs(created_at);
     CREATE INDEX IF NOT EXISTS idx_audit_logs_result ON audit_logs(result);
+    CREATE INDEX IF NOT EXISTS idx_audit_logs_user_type_created ON audit_logs(user_id, event_type, created_at DESC);
     """
     
     async with db_manager.pool.acquire() as conn:
@@ -656,12 +873,20 @@ async def get_database_manager() -> DatabaseManager:
     """Get global database manager"""
     global _db_manager
     if _db_manager is None:
-        config = DatabaseConfig(dsn=settings.database_url)
+        config = DatabaseConfig(**settings.get_database_config())
         _db_manager = DatabaseManager(config)
         await _db_manager.initialize()
     return _db_manager
 
 
+async def close_database_manager():
+    """Close the global database manager's connection pool"""
+    global _db_manager
+    if _db_manager is not None:
+        await _db_manager.close()
+        _db_manager = None
+
+
 async def initialize_database():
     """Initialize database with schema"""
     db_manager = await get_database_manager()
@@ -47,7 +47,9 @@ class QueryResult:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
-        return asdict(self)
+        data = asdict(self)
+        data["status"] = self.status.value
+        return data
     
     @property
     def success(self) -> bool:
@@ -517,6 +519,15 @@ async def get_global_goose_client() -> GooseQueryExpertClient:
     return _global_client
 
 
+async def close_global_goose_client():
+    """Close global Goose client instance"""
+    global _global_client
+    if _global_client is not None:
+        if hasattr(_global_client.client, 'close'):
+            await _global_client.client.close()
+        _global_client = None
+
+
 if __name__ == "__main__":
     # Test the client
     async def test_client():
@@ -0,0 +1,15 @@
+-- Migration V003: Store bot scopes as a native text[] array
+-- asyncpg maps text[] straight to a Python list, so scopes no longer need to be
+-- joined and split as a comma-separated string on every save/load
+
+-- UP
+ALTER TABLE slack_installations
+    ALTER COLUMN bot_scopes TYPE TEXT[] USING string_to_array(NULLIF(bot_scopes, ''), ',');
+
+COMMENT ON COLUMN slack_installations.bot_scopes IS 'Array of bot scopes';
+
+-- DOWN
+ALTER TABLE slack_installations
+    ALTER COLUMN bot_scopes TYPE TEXT USING array_to_string(bot_scopes, ',');
+
+COMMENT ON COLUMN slack_installations.bot_scopes IS 'Comma-separated list of bot scopes';
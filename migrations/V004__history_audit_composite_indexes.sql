@@ -0,0 +1,18 @@
+-- Migration V004: Composite indexes for per-user history and audit lookups
+-- get_user_history filters on user_id and orders by created_at DESC; with the
+-- composite index that is a single index range scan instead of a scan and sort.
+-- The composites lead with user_id, so they also serve every lookup the
+-- single-column user_id indexes did; those are dropped rather than maintained
+-- on every insert.
+
+-- UP
+CREATE INDEX IF NOT EXISTS idx_query_history_user_created ON query_history(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_type_created ON audit_logs(user_id, event_type, created_at DESC);
+DROP INDEX IF EXISTS idx_query_history_user;
+DROP INDEX IF EXISTS idx_audit_logs_user;
+
+-- DOWN
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user ON audit_logs(user_id);
+CREATE INDEX IF NOT EXISTS idx_query_history_user ON query_history(user_id);
+DROP INDEX IF EXISTS idx_audit_logs_user_type_created;
+DROP INDEX IF EXISTS idx_query_history_user_created;
@@ -70,7 +70,7 @@ class UserManager:
         # Format data for display
         data = []
         for row in rows:
-            roles = json.loads(row["roles"] or "[]")
+            roles = row["roles"] or []
             data.append([
                 row["slack_user_id"],
                 row["internal_user_id"],
@@ -348,8 +348,8 @@ class UserManager:
             writer.writeheader()
             
             for row in rows:
-                roles = json.loads(row['roles'] or '[]')
-                permissions = json.loads(row['permissions'] or '[]')
+                roles = row['roles'] or []
+                permissions = row['permissions'] or []
                 
                 writer.writerow({
                     'slack_user_id': row['slack_user_id'],
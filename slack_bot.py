@@ -23,7 +23,7 @@ from database import (
     get_database_manager, UserSessionRepository, QueryHistoryRepository,
     UserMappingRepository, AuditLogRepository
 )
-from auth import AuthSystem, create_auth_system, UserContext as AuthUserContext
+from auth import AuthSystem, Permission, create_auth_system, UserContext as AuthUserContext
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
@@ -353,6 +353,9 @@ class GooseSlackBot:
         
         # Active queries tracking
         self._active_queries = {}
+        
+        # Bot's own Slack user ID, fetched once via auth.test
+        self._bot_user_id: Optional[str] = None
     
     async def initialize(self):
         """Initialize database and auth system"""
@@ -407,15 +410,16 @@ class GooseSlackBot:
     
     async def _handle_message_event(self, event, say, client):
         """Handle regular message events"""
+        is_dm = event.get("channel_type") == "im"
+        
         # Skip bot messages and threaded replies (unless it's a DM)
-        if event.get("bot_id") or (event.get("thread_ts") and event.get("channel_type") != "im"):
+        if event.get("bot_id") or (event.get("thread_ts") and not is_dm):
             return
         
         # Only process direct messages or messages in channels where bot is mentioned
-        channel_type = event.get("channel_type", "")
         text = event.get("text", "").lower()
         
-        if channel_type == "im" or "query" in text or "data" in text:
+        if is_dm or "query" in text or "data" in text:
             await self._process_query_request(event, say, client)
     
     async def _handle_mention_event(self, event, say, client):
@@ -430,7 +434,8 @@ class GooseSlackBot:
         thread_ts = event.get("ts")
         
         # Remove bot mention from text
-        text = text.replace(f"<@{self.app.client.auth_test()['user_id']}>", "").strip()
+        bot_user_id = await self._get_bot_user_id(client)
+        text = text.replace(f"<@{bot_user_id}>", "").strip()
         
         if not text or len(text) < 5:
             await say(
@@ -454,7 +459,7 @@ class GooseSlackBot:
                 return
             
             # Check permissions
-            if not user_context.has_permission("query_execute"):
+            if not user_context.has_permission(Permission.QUERY_EXECUTE):
                 await say(
                     text="🔒 You don't have permission to execute queries. "
                          "Contact your admin for access.",
@@ -462,8 +467,8 @@ class GooseSlackBot:
                 )
                 return
             
-            # Log the request
-            await self.audit_repo.log_event(
+            # Log the request; buffered audit events are written once the request finishes
+            self.audit_repo.buffer_event(
                 event_type="query_request",
                 user_id=user_context.user_id,
                 slack_user_id=user_id,
@@ -484,6 +489,18 @@ class GooseSlackBot:
                      "Please try again or contact support.",
                 thread_ts=thread_ts
             )
+        
+        finally:
+            try:
+                await self.audit_repo.flush()
+            except Exception as e:
+                logger.error("Failed to write audit events", error=str(e), user_id=user_id)
+    
+    async def _get_bot_user_id(self, client) -> str:
+        """Return the bot's user ID, calling auth.test only the first time"""
+        if self._bot_user_id is None:
+            self._bot_user_id = (await client.auth_test())["user_id"]
+        return self._bot_user_id
     
     async def _execute_user_query(
         self, question: str, user_context: AuthUserContext, 
@@ -610,7 +627,7 @@ class GooseSlackBot:
             )
         
         # Log completion
-        await self.audit_repo.log_event(
+        self.audit_repo.buffer_event(
             event_type="query_execute",
             user_id=user_context.user_id,
             slack_user_id=slack_user_id,
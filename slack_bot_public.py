@@ -5,10 +5,8 @@ Supports Events API, OAuth, and multi-workspace distribution
 
 import os
 import asyncio
-import hmac
-import hashlib
 import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 from slack_bolt.async_app import AsyncApp
@@ -16,17 +14,60 @@ from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
 from slack_bolt.oauth.async_oauth_settings import AsyncOAuthSettings
 from slack_sdk.oauth.installation_store import Installation
 from slack_sdk.oauth.state_store import FileOAuthStateStore
+from slack_sdk.signature import SignatureVerifier
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+import orjson
 import structlog
 
 from config import get_settings
-from database import get_database_manager, UserSessionRepository, QueryHistoryRepository
-from goose_client import GooseQueryExpertClient, UserContext
+from database import (
+    get_database_manager, close_database_manager,
+    UserSessionRepository, QueryHistoryRepository
+)
+from goose_client import UserContext, get_global_goose_client, close_global_goose_client
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Installation queries are kept as fixed strings so asyncpg's per-connection
+# statement cache hits on every call and skips the parse/plan step
+_SQL_UPSERT_INSTALLATION = """
+    INSERT INTO slack_installations 
+    (team_id, team_name, bot_token, bot_user_id, bot_scopes, installed_at, updated_at)
+    VALUES ($1, $2, $3, $4, $5, NOW(), NOW())
+    ON CONFLICT (team_id) DO UPDATE SET
+        team_name = EXCLUDED.team_name,
+        bot_token = EXCLUDED.bot_token,
+        bot_user_id = EXCLUDED.bot_user_id,
+        bot_scopes = EXCLUDED.bot_scopes,
+        updated_at = NOW()
+"""
+
+_SQL_FIND_INSTALLATION = """
+    SELECT team_id, team_name, bot_token, bot_user_id, bot_scopes
+    FROM slack_installations
+    WHERE team_id = $1
+"""
+
+_SQL_DELETE_INSTALLATION = "DELETE FROM slack_installations WHERE team_id = $1"
+
+# Bot scopes requested at install time
+_SCOPES = (
+    "app_mentions:read",
+    "channels:history",
+    "channels:read",
+    "chat:write",
+    "commands",
+    "users:read"
+)
+
+# Only used for the url_verification fast path; Bolt verifies everything else
+_signature_verifier = SignatureVerifier(settings.slack_signing_secret)
+
+# Batches at or above this size are merged through COPY instead of executemany
+BULK_COPY_THRESHOLD = 100
+
 
 # ============================================================================
 # Installation Store - Stores OAuth tokens for each workspace
@@ -41,25 +82,72 @@ class DatabaseInstallationStore:
     async def async_save(self, installation: Installation):
         """Save installation to database"""
         await self.db.execute_command(
-            """
-            INSERT INTO slack_installations 
-            (team_id, team_name, bot_token, bot_user_id, bot_scopes, installed_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, NOW(), NOW())
-            ON CONFLICT (team_id) DO UPDATE SET
-                team_name = EXCLUDED.team_name,
-                bot_token = EXCLUDED.bot_token,
-                bot_user_id = EXCLUDED.bot_user_id,
-                bot_scopes = EXCLUDED.bot_scopes,
-                updated_at = NOW()
-            """,
+            _SQL_UPSERT_INSTALLATION,
             installation.team_id,
             installation.team_name,
             installation.bot_token,
             installation.bot_user_id,
-            ','.join(installation.bot_scopes) if installation.bot_scopes else ''
+            installation.bot_scopes or []
         )
         logger.info("Saved installation", team_id=installation.team_id)
     
+    async def async_save_many(self, installations: List[Installation]):
+        """Save a batch of installations in a single round-trip"""
+        if not installations:
+            return
+        
+        records = [
+            (
+                i.team_id,
+                i.team_name,
+                i.bot_token,
+                i.bot_user_id,
+                i.bot_scopes or []
+            )
+            for i in installations
+        ]
+        
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction():
+                if len(records) < BULK_COPY_THRESHOLD:
+                    # executemany pipelines the binds for small batches
+                    await conn.executemany(_SQL_UPSERT_INSTALLATION, records)
+                else:
+                    # COPY into a transaction-scoped staging table, then merge.
+                    # ord keeps the batch order so the last duplicate of a team
+                    # wins, as it does with executemany
+                    await conn.execute(
+                        """
+                        CREATE TEMP TABLE slack_installations_stage
+                        (ord INTEGER, team_id VARCHAR(50), team_name VARCHAR(255), bot_token TEXT,
+                         bot_user_id VARCHAR(50), bot_scopes TEXT[])
+                        ON COMMIT DROP
+                        """
+                    )
+                    await conn.copy_records_to_table(
+                        'slack_installations_stage',
+                        records=[(position, *record) for position, record in enumerate(records)],
+                        columns=['ord', 'team_id', 'team_name', 'bot_token', 'bot_user_id', 'bot_scopes']
+                    )
+                    await conn.execute(
+                        """
+                        INSERT INTO slack_installations 
+                        (team_id, team_name, bot_token, bot_user_id, bot_scopes, installed_at, updated_at)
+                        SELECT DISTINCT ON (team_id)
+                            team_id, team_name, bot_token, bot_user_id, bot_scopes, NOW(), NOW()
+                        FROM slack_installations_stage
+                        ORDER BY team_id, ord DESC
+                        ON CONFLICT (team_id) DO UPDATE SET
+                            team_name = EXCLUDED.team_name,
+                            bot_token = EXCLUDED.bot_token,
+                            bot_user_id = EXCLUDED.bot_user_id,
+                            bot_scopes = EXCLUDED.bot_scopes,
+                            updated_at = NOW()
+                        """
+                    )
+        
+        logger.info("Saved installations", count=len(records))
+    
     async def async_find_installation(
         self, 
         enterprise_id: Optional[str],
@@ -72,14 +160,7 @@ class DatabaseInstallationStore:
         logger.info("Looking for installation", team_id=team_id, enterprise_id=enterprise_id)
         
         try:
-            row = await self.db.execute_one(
-                """
-                SELECT team_id, team_name, bot_token, bot_user_id, bot_scopes
-                FROM slack_installations
-                WHERE team_id = $1
-                """,
-                team_id
-            )
+            row = await self.db.execute_one(_SQL_FIND_INSTALLATION, team_id)
             
             if not row:
                 logger.warning("Installation not found in database", team_id=team_id)
@@ -95,7 +176,7 @@ class DatabaseInstallationStore:
                 bot_token=row['bot_token'],
                 bot_id=row['bot_user_id'],
                 bot_user_id=row['bot_user_id'],
-                bot_scopes=row['bot_scopes'].split(',') if row['bot_scopes'] else [],
+                bot_scopes=row['bot_scopes'] or [],
                 user_id=user_id,
                 installed_at=time.time()
             )
@@ -110,10 +191,7 @@ class DatabaseInstallationStore:
         user_id: Optional[str] = None
     ):
         """Delete installation"""
-        await self.db.execute_command(
-            "DELETE FROM slack_installations WHERE team_id = $1",
-            team_id
-        )
+        await self.db.execute_command(_SQL_DELETE_INSTALLATION, team_id)
         logger.info("Deleted installation", team_id=team_id)
 
 
@@ -128,14 +206,7 @@ async def get_oauth_settings():
     return AsyncOAuthSettings(
         client_id=settings.slack_client_id,
         client_secret=settings.slack_client_secret,
-        scopes=[
-            "app_mentions:read",
-            "channels:history",
-            "channels:read",
-            "chat:write",
-            "commands",
-            "users:read"
-        ],
+        scopes=list(_SCOPES),
         installation_store=DatabaseInstallationStore(db_manager),
         state_store=FileOAuthStateStore(
             expiration_seconds=600,
@@ -169,7 +240,8 @@ async def create_slack_app():
 fastapi_app = FastAPI(
     title="Goose Query Expert Slackbot",
     description="AI-powered data analysis bot for Slack",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Global Slack app instance
@@ -194,6 +266,13 @@ async def startup_event():
     logger.info("Slackbot started successfully")
 
 
+@fastapi_app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources on shutdown"""
+    await close_global_goose_client()
+    await close_database_manager()
+
+
 # ============================================================================
 # Webhook Endpoints
 # ============================================================================
@@ -201,31 +280,22 @@ async def startup_event():
 @fastapi_app.post("/slack/events")
 async def slack_events(request: Request):
     """Handle Slack events via webhook"""
-    
-    # Verify Slack signature
+    # Answer the one-off URL verification challenge without routing through
+    # Bolt; Starlette caches the body so Bolt can still read it below
     body = await request.body()
-    timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
-    signature = request.headers.get("X-Slack-Signature", "")
-    
-    if not verify_slack_signature(body, timestamp, signature):
-        return JSONResponse({"error": "Invalid signature"}, status_code=403)
+    if b'"url_verification"' in body[:200] and _signature_verifier.is_valid_request(
+        body, dict(request.headers)
+    ):
+        return PlainTextResponse(orjson.loads(body)["challenge"])
     
-    # Handle the event
+    # Bolt verifies the request signature before dispatching
     return await slack_handler.handle(request)
 
 
 @fastapi_app.post("/slack/interactions")
 async def slack_interactions(request: Request):
     """Handle Slack interactive components"""
-    
-    # Verify signature
-    body = await request.body()
-    timestamp = request.headers.get("X-Slack-Request-Timestamp", "")
-    signature = request.headers.get("X-Slack-Signature", "")
-    
-    if not verify_slack_signature(body, timestamp, signature):
-        return JSONResponse({"error": "Invalid signature"}, status_code=403)
-    
+    # Bolt verifies the request signature before dispatching
     return await slack_handler.handle(request)
 
 
@@ -245,63 +315,40 @@ async def install(request: Request):
 # Health Check Endpoints
 # ============================================================================
 
+# Health payload is shared across probes; the timestamp is refreshed at most
+# once per second instead of being formatted on every request
+_HEALTH_PAYLOAD = {
+    "status": "healthy",
+    "service": "goose-query-expert-slackbot",
+    "timestamp": ""
+}
+_health_second = -1
+
+
 @fastapi_app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "goose-query-expert-slackbot",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    global _health_second
+    now = int(time.time())
+    if now != _health_second:
+        _health_second = now
+        _HEALTH_PAYLOAD["timestamp"] = datetime.utcfromtimestamp(now).isoformat()
+    return _HEALTH_PAYLOAD
+
+
+# The install link only depends on settings, so the response is built once
+_ROOT_RESPONSE = {
+    "name": "Goose Query Expert Slackbot",
+    "description": "AI-powered data analysis bot for Slack (channels only, no DMs)",
+    "install_url": f"https://slack.com/oauth/v2/authorize?client_id={settings.slack_client_id}&scope={','.join(_SCOPES)}",
+    "scopes": _SCOPES
+}
 
 
 @fastapi_app.get("/")
 async def root():
     """Root endpoint with installation link"""
-    install_url = f"https://slack.com/oauth/v2/authorize?client_id={settings.slack_client_id}&scope=app_mentions:read,channels:history,channels:read,chat:write,commands,users:read"
-    
-    return {
-        "name": "Goose Query Expert Slackbot",
-        "description": "AI-powered data analysis bot for Slack (channels only, no DMs)",
-        "install_url": install_url,
-        "scopes": [
-            "app_mentions:read",
-            "channels:history", 
-            "channels:read",
-            "chat:write",
-            "commands",
-            "users:read"
-        ]
-    }
-
-
-# ============================================================================
-# Signature Verification
-# ============================================================================
-
-def verify_slack_signature(body: bytes, timestamp: str, signature: str) -> bool:
-    """Verify Slack request signature"""
-    
-    # Check timestamp (prevent replay attacks)
-    try:
-        request_timestamp = int(timestamp)
-        current_timestamp = int(time.time())
-        
-        if abs(current_timestamp - request_timestamp) > 300:  # 5 minutes
-            logger.warning("Request timestamp too old", timestamp=timestamp)
-            return False
-    except ValueError:
-        return False
-    
-    # Verify signature
-    sig_basestring = f"v0:{timestamp}:{body.decode()}"
-    computed_signature = "v0=" + hmac.new(
-        settings.slack_signing_secret.encode(),
-        sig_basestring.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    
-    return hmac.compare_digest(computed_signature, signature)
+    return _ROOT_RESPONSE
 
 
 # ============================================================================
@@ -312,9 +359,9 @@ def setup_event_handlers(app: AsyncApp):
     """Setup Slack event handlers"""
     
     @app.event("app_mention")
-    async def handle_app_mention(event, say, client):
+    async def handle_app_mention(event, say, client, context):
         """Handle app mentions in channels"""
-        await process_query_request(event, say, client)
+        await process_query_request(event, say, client, context)
     
     @app.action("refine_query")
     async def handle_refine_query(ack, body, client):
@@ -329,7 +376,7 @@ def setup_event_handlers(app: AsyncApp):
         # Implementation here
     
     @app.command("/goose-query")
-    async def handle_slash_command(ack, command, say, client):
+    async def handle_slash_command(ack, command, say, client, context):
         """Handle slash command"""
         await ack()
         
@@ -340,10 +387,10 @@ def setup_event_handlers(app: AsyncApp):
             "ts": str(time.time())
         }
         
-        await process_query_request(event, say, client)
+        await process_query_request(event, say, client, context)
 
 
-async def process_query_request(event, say, client):
+async def process_query_request(event, say, client, context):
     """Process a query request from user"""
     
     user_id = event["user"]
@@ -351,8 +398,12 @@ async def process_query_request(event, say, client):
     text = event.get("text", "")
     thread_ts = event.get("ts")
     
-    # Remove bot mention
-    text = text.replace(f"<@{client.auth_test()['user_id']}>", "").strip()
+    # Remove bot mention - Bolt resolves the bot user ID from the
+    # installation, so no auth.test round-trip is needed per event
+    bot_user_id = context.get("bot_user_id")
+    if bot_user_id:
+        text = text.replace(f"<@{bot_user_id}>", "")
+    text = text.strip()
     
     if not text or len(text) < 5:
         await say(
@@ -371,8 +422,8 @@ async def process_query_request(event, say, client):
             thread_ts=thread_ts
         )
         
-        # Process with Goose Query Expert
-        goose_client = GooseQueryExpertClient()
+        # Process with Goose Query Expert (shared across events)
+        goose_client = await get_global_goose_client()
         user_context = UserContext(
             user_id=user_id,
             slack_user_id=user_id,
@@ -416,5 +467,7 @@ if __name__ == "__main__":
         "slack_bot_public:fastapi_app",
         host=settings.host,
         port=settings.port,
-        reload=settings.auto_reload
+        reload=settings.auto_reload,
+        # "auto" selects uvloop when it is installed and falls back to asyncio
+        loop="auto"
     )
@@ -5,7 +5,7 @@ Simpler approach - bot connects directly to Slack, no webhooks needed
 
 import os
 import asyncio
-import re
+import signal
 from slack_sdk.rtm_v2 import RTMClient
 from slack_sdk.web.async_client import AsyncWebClient
 import structlog
@@ -54,11 +54,12 @@ async def handle_message(client: RTMClient, event: dict):
     bot_id = await get_bot_user_id()
     
     # Check if bot was mentioned
-    if f"<@{bot_id}>" in text:
+    mention = f"<@{bot_id}>"
+    if mention in text:
         logger.info(f"Bot was mentioned by user {user} in channel {channel}")
         
         # Remove bot mention from text
-        clean_text = re.sub(f'<@{bot_id}>', '', text).strip()
+        clean_text = text.replace(mention, "").strip()
         
         try:
             # Send response
@@ -111,6 +112,18 @@ async def start_web_server():
     await site.start()
     logger.info(f"Web server started on port {port}")
 
+async def wait_for_shutdown_signal():
+    """Block without polling until the process receives SIGTERM or SIGINT"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows event loops don't support signal handlers
+            pass
+    await stop.wait()
+
 async def main():
     """Main entry point"""
     logger.info("🚀 Starting Slack Bot with RTM API...")
@@ -124,9 +137,10 @@ async def main():
         await rtm_client.connect()
         logger.info("✅ RTM client connected successfully!")
         
-        # Keep running
-        while True:
-            await asyncio.sleep(1)
+        # Keep running until SIGTERM/SIGINT
+        await wait_for_shutdown_signal()
+        logger.info("Shutting down...")
+        rtm_client.close()
             
     except KeyboardInterrupt:
         logger.info("Shutting down...")
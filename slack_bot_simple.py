@@ -4,6 +4,7 @@ For single workspace deployment
 """
 
 import os
+import re
 import hmac
 import hashlib
 import time
@@ -21,6 +22,16 @@ from config import get_settings
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Matches any user mention token, e.g. <@U012ABCDEF>
+_MENTION_RE = re.compile(r"<@[A-Z0-9]+>")
+
+
+def strip_bot_mention(text: str, bot_user_id: Optional[str]) -> str:
+    """Remove the bot's own mention, falling back to the regex if its ID is unknown"""
+    if bot_user_id:
+        return text.replace(f"<@{bot_user_id}>", "", 1).strip()
+    return _MENTION_RE.sub("", text).strip()
+
 # ============================================================================
 # Slack App Initialization - Direct Token (No OAuth)
 # ============================================================================
@@ -71,8 +82,10 @@ async def startup_event():
 @fastapi_app.post("/slack/events")
 async def slack_events(request: Request):
     """Handle Slack events via webhook"""
+    # Starlette caches the body, so Bolt's own read below reuses this buffer
     body = await request.body()
-    logger.info(f"Received Slack event: {body.decode()[:500]}")  # Log first 500 chars
+    # Slice before decoding so only the logged prefix is copied into a str
+    logger.info(f"Received Slack event: {body[:500].decode(errors='replace')}")
     
     try:
         result = await slack_handler.handle(request)
@@ -99,7 +112,7 @@ def setup_event_handlers(app: AsyncApp):
     """Setup Slack event handlers"""
     
     @app.event("app_mention")
-    async def handle_app_mention(event, say, logger):
+    async def handle_app_mention(event, say, context, logger):
         """Handle app mentions in channels"""
         logger.info(f"Received app_mention event: {event}")
         
@@ -107,8 +120,7 @@ def setup_event_handlers(app: AsyncApp):
         text = event.get("text", "")
         
         # Remove bot mention
-        import re
-        text = re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+        text = strip_bot_mention(text, context.get("bot_user_id"))
         
         logger.info(f"Processing message from user {user_id}: {text}")
         
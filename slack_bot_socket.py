@@ -4,7 +4,11 @@ Simpler than webhooks - uses WebSocket connection
 """
 
 import os
+import re
+import logging
 import asyncio
+import signal
+from typing import Optional
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 from aiohttp import web
@@ -12,6 +16,17 @@ import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Matches any user mention token, e.g. <@U012ABCDEF>
+_MENTION_RE = re.compile(r"<@[A-Z0-9]+>")
+
+
+def strip_bot_mention(text: str, bot_user_id: Optional[str]) -> str:
+    """Remove the bot's own mention, falling back to the regex if its ID is unknown"""
+    if bot_user_id:
+        return text.replace(f"<@{bot_user_id}>", "", 1).strip()
+    return _MENTION_RE.sub("", text).strip()
+
+
 # Get tokens from environment
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
@@ -24,17 +39,13 @@ if not SLACK_APP_TOKEN:
 # Initialize Slack app
 app = AsyncApp(token=SLACK_BOT_TOKEN)
 
-@app.event("app_mention")
-async def handle_app_mention(event, say, logger):
-    """Handle app mentions"""
-    logger.info(f"📨 Received app_mention: {event}")
-    
+async def reply_to_mention(event, say, bot_user_id):
+    """Reply to a single app mention"""
     user_id = event["user"]
     text = event.get("text", "")
     
     # Remove bot mention
-    import re
-    text = re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+    text = strip_bot_mention(text, bot_user_id)
     
     logger.info(f"Processing message from {user_id}: {text}")
     
@@ -53,12 +64,25 @@ async def handle_app_mention(event, say, logger):
     except Exception as e:
         logger.error(f"Error sending response: {str(e)}", exc_info=True)
 
+
+@app.event("app_mention")
+async def handle_app_mention(event, say, context, logger):
+    """Handle app mentions"""
+    logger.info(f"📨 Received app_mention: {event}")
+    
+    await reply_to_mention(event, say, context.get("bot_user_id"))
+
 @app.event("message")
 async def handle_message(event, logger):
     """Handle message events"""
-    # Only log, don't respond to every message
-    if event.get("subtype") is None:  # Regular messages only
-        logger.info(f"📝 Message received: {event.get('text', '')[:50]}...")
+    # Only log, don't respond to every message. This fires for every channel
+    # message, so bail out before touching the event unless debug logging is on.
+    # The listener stays registered so Bolt doesn't warn about unhandled events.
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if event.get("subtype") is not None:  # Regular messages only
+        return
+    logger.debug("📝 Message received: %s...", event.get('text', '')[:50])
 
 async def start_web_server():
     """Start web server for Heroku health checks"""
@@ -81,6 +105,18 @@ async def start_web_server():
     logger.info(f"🌐 Web server started on port {port}")
     return runner
 
+async def wait_for_shutdown_signal():
+    """Block without polling until the process receives SIGTERM or SIGINT"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows event loops don't support signal handlers
+            pass
+    await stop.wait()
+
 async def main():
     """Main entry point"""
     logger.info("🚀 Starting Slack Bot with Socket Mode...")
@@ -95,13 +131,16 @@ async def main():
         handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
         
         logger.info("🔌 Connecting to Slack via Socket Mode...")
-        await handler.start_async()
+        # connect_async() returns once connected; start_async() would block forever
+        await handler.connect_async()
         
         logger.info("✅ Socket Mode connected! Bot is ready to receive messages.")
         
-        # Keep running
-        while True:
-            await asyncio.sleep(1)
+        # Keep running until SIGTERM/SIGINT
+        await wait_for_shutdown_signal()
+        logger.info("Shutting down...")
+        await handler.close_async()
+        await runner.cleanup()
             
     except KeyboardInterrupt:
         logger.info("Shutting down...")
@@ -110,4 +149,9 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
@@ -5,7 +5,7 @@ Based on APP_TYPE environment variable
 
 import os
 import sys
-import subprocess
+import asyncio
 
 app_type = os.environ.get("APP_TYPE", "slackbot").lower()
 
@@ -15,8 +15,9 @@ if app_type == "mcp":
     mcp_server_heroku.run_server()
 elif app_type == "slackbot":
     print("🤖 Starting Slackbot...")
-    # Run bot.py as a subprocess since it has its own event loop
-    subprocess.run([sys.executable, "bot.py"])
+    # Run bot.main() in this interpreter rather than forking a second Python
+    import bot
+    asyncio.run(bot.main())
 else:
     print(f"❌ Unknown APP_TYPE: {app_type}")
     print("Set APP_TYPE to 'slackbot' or 'mcp'")
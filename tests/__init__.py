@@ -5,6 +5,9 @@ Test package for Goose Slackbot
 import os
 import sys
 import asyncio
+import itertools
+import pytest
+import uuid
 from pathlib import Path
 
 # Add project root to path
@@ -19,10 +22,40 @@ TEST_SLACK_APP_TOKEN = "xapp-test-token"
 
 # Common test utilities
 def async_test(func):
-    """Decorator for async test functions"""
-    def wrapper(*args, **kwargs):
-        return asyncio.run(func(*args, **kwargs))
-    return wrapper
+    """Decorator for async test functions
+    
+    Hands the coroutine to pytest-asyncio so it runs on the session event loop
+    (see the event_loop fixture in conftest.py) with its fixtures injected,
+    rather than on a fresh loop per test where the shared pool can't be used.
+    """
+    return pytest.mark.asyncio(func)
+
+async def gather_bounded(coros, limit, return_exceptions=False):
+    """Await coroutines concurrently, at most `limit` at a time, preserving order
+    
+    Keeping `limit` at the pool's max_size stops surplus tasks from piling up on
+    pool.acquire(). `return_exceptions` is passed through to asyncio.gather.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(coro):
+        async with semaphore:
+            return await coro
+    
+    return await asyncio.gather(
+        *(run(coro) for coro in coros), return_exceptions=return_exceptions
+    )
+
+_uuid_counter = itertools.count(1)
+
+def fast_uuid() -> str:
+    """Cheap, process-unique UUID string for test data
+    
+    Built from a counter instead of os.urandom; use uuid.uuid4() only where a
+    test actually needs random or cross-process-unique IDs.
+    """
+    # Version 4 and RFC 4122 variant bits set so it still parses as a v4 UUID
+    return str(uuid.UUID(int=next(_uuid_counter) | (0x4 << 76) | (0x2 << 62)))
 
 # Test data constants
 SAMPLE_USER_ID = "U123456789"
@@ -0,0 +1,261 @@
+"""
+In-memory stand-ins for the database repositories
+
+They expose the same async methods as the repositories in database.py but
+keep rows in plain dicts and lists, for tests that only assert on logical
+state and don't need to exercise the SQL path.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+
+from auth import UserContext
+
+
+class InMemoryUserMappingRepo:
+    """In-memory UserMappingRepository"""
+
+    def __init__(self):
+        self.mappings: Dict[str, Dict[str, Any]] = {}
+
+    async def create_or_update_mapping(
+        self,
+        slack_user_id: str,
+        internal_user_id: str,
+        ldap_id: str = None,
+        email: str = None,
+        full_name: str = None,
+        roles: List[str] = None,
+        permissions: List[str] = None
+    ):
+        now = datetime.now(timezone.utc)
+        created_at = self.mappings.get(slack_user_id, {}).get("created_at", now)
+        self.mappings[slack_user_id] = {
+            "slack_user_id": slack_user_id,
+            "internal_user_id": internal_user_id,
+            "ldap_id": ldap_id,
+            "email": email,
+            "full_name": full_name,
+            "roles": roles or [],
+            "permissions": permissions or [],
+            "is_active": True,
+            "user_metadata": {},
+            "created_at": created_at,
+            "updated_at": now
+        }
+
+    async def get_mapping(self, slack_user_id: str) -> Optional[Dict[str, Any]]:
+        mapping = self.mappings.get(slack_user_id)
+        if mapping and mapping["is_active"]:
+            return dict(mapping)
+        return None
+
+
+class InMemorySessionRepo:
+    """In-memory UserSessionRepository"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+
+    async def create_session(
+        self,
+        user_id: str,
+        slack_user_id: str,
+        channel_id: str,
+        context: Dict[str, Any] = None
+    ) -> str:
+        session_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        self.sessions[session_id] = {
+            "id": session_id,
+            "user_id": user_id,
+            "slack_user_id": slack_user_id,
+            "channel_id": channel_id,
+            "context": context or {},
+            "created_at": now,
+            "updated_at": now,
+            "last_activity": now,
+            "is_active": True
+        }
+        return session_id
+
+    async def get_session(self, user_id: str, channel_id: str) -> Optional[Dict[str, Any]]:
+        matches = [
+            session for session in self.sessions.values()
+            if session["user_id"] == user_id
+            and session["channel_id"] == channel_id
+            and session["is_active"]
+        ]
+        if not matches:
+            return None
+        return dict(max(matches, key=lambda session: session["last_activity"]))
+
+    async def update_session_activity(
+        self,
+        session_id: str,
+        context: Dict[str, Any] = None,
+        now: datetime = None
+    ):
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        now = now or datetime.now(timezone.utc)
+        session["last_activity"] = session["updated_at"] = now
+        if context:
+            session["context"] = context
+
+
+class InMemoryQueryHistoryRepo:
+    """In-memory QueryHistoryRepository"""
+
+    def __init__(self):
+        self.history: List[Dict[str, Any]] = []
+        self.by_query_id: Dict[str, Dict[str, Any]] = {}
+
+    async def save_query(
+        self,
+        session_id: str,
+        user_id: str,
+        slack_user_id: str,
+        channel_id: str,
+        query_id: str,
+        original_question: str,
+        generated_sql: str = None,
+        query_result: Dict[str, Any] = None,
+        execution_time: float = None,
+        row_count: int = 0,
+        success: bool = False,
+        error_message: str = None,
+        metadata: Dict[str, Any] = None
+    ):
+        row = {
+            "session_id": session_id,
+            "user_id": user_id,
+            "slack_user_id": slack_user_id,
+            "channel_id": channel_id,
+            "query_id": query_id,
+            "original_question": original_question,
+            "generated_sql": generated_sql,
+            "query_result": query_result,
+            "execution_time": execution_time,
+            "row_count": row_count,
+            "success": success,
+            "error_message": error_message,
+            "metadata": metadata,
+            "created_at": datetime.now(timezone.utc)
+        }
+        self.history.append(row)
+        self.by_query_id[query_id] = row
+
+    async def save_queries_bulk(self, queries: List[Dict[str, Any]]):
+        for query in queries:
+            await self.save_query(**query)
+
+    async def get_query_by_id(self, query_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_query_id.get(query_id)
+
+    async def get_user_history(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        # Appended in insertion order, so newest-first is a reversed walk
+        rows = [row for row in reversed(self.history) if row["user_id"] == user_id]
+        return rows[:limit]
+
+
+class InMemoryAuditLogRepo:
+    """In-memory AuditLogRepository"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.pending: List[Dict[str, Any]] = []
+
+    async def log_event(
+        self,
+        event_type: str,
+        user_id: str,
+        action: str,
+        result: str = "success",
+        slack_user_id: str = None,
+        channel_id: str = None,
+        resource: str = None,
+        ip_address: str = None,
+        user_agent: str = None,
+        request_id: str = None,
+        session_id: str = None,
+        event_data: Dict[str, Any] = None,
+        error_message: str = None
+    ):
+        self.events.append({
+            "event_type": event_type,
+            "user_id": user_id,
+            "action": action,
+            "result": result,
+            "slack_user_id": slack_user_id,
+            "channel_id": channel_id,
+            "resource": resource,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "request_id": request_id,
+            "session_id": session_id,
+            "event_data": event_data or {},
+            "error_message": error_message
+        })
+
+    def buffer_event(self, **event):
+        self.pending.append(event)
+
+    async def flush(self):
+        records, self.pending = self.pending, []
+        for event in records:
+            await self.log_event(**event)
+
+    def find(self, **filters) -> Optional[Dict[str, Any]]:
+        """Return the first logged event whose fields match all filters"""
+        for event in self.events:
+            if all(event.get(field) == value for field, value in filters.items()):
+                return event
+        return None
+
+
+class StubGoose:
+    """Stand-in for GooseQueryExpertClient.process_user_question
+    
+    Returns `result`, or whatever `side_effect(question, user_context,
+    progress_callback)` returns, and records (question, user_context) calls.
+    """
+
+    def __init__(self, result=None, side_effect=None):
+        self.result = result
+        self.side_effect = side_effect
+        self.calls = []
+
+    async def process_user_question(self, question, user_context, progress_callback=None):
+        self.calls.append((question, user_context))
+        if self.side_effect is not None:
+            return self.side_effect(question, user_context, progress_callback)
+        return self.result
+
+
+class FakeAuthSystem:
+    """Stand-in for auth.AuthSystem.authenticate_user
+    
+    AuthSystem keeps mappings and sessions in Redis; this resolves users through
+    any repository with get_mapping (UserMappingRepository or
+    InMemoryUserMappingRepo) and skips the session.
+    """
+
+    def __init__(self, user_repo):
+        self.user_repo = user_repo
+
+    async def authenticate_user(self, slack_user_id: str) -> Optional[UserContext]:
+        mapping = await self.user_repo.get_mapping(slack_user_id)
+        if not mapping:
+            return None
+        return UserContext(
+            user_id=mapping["internal_user_id"],
+            slack_user_id=slack_user_id,
+            email=mapping.get("email"),
+            full_name=mapping.get("full_name"),
+            ldap_id=mapping.get("ldap_id"),
+            roles=mapping.get("roles", []),
+            permissions=mapping.get("permissions", [])
+        )
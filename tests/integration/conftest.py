@@ -0,0 +1,123 @@
+"""
+Fixtures shared by the integration tests
+
+Expensive objects (the Slack bot, the auth mock) are built once per session
+and reset between tests; database state is isolated by the per-test
+rolled-back transaction behind test_db_manager.
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from auth import AuthSystem
+from database import (
+    UserSessionRepository, QueryHistoryRepository,
+    UserMappingRepository, AuditLogRepository
+)
+from slack_bot import GooseSlackBot
+from tests.fakes import StubGoose
+
+
+@pytest.fixture
+def db_manager(test_db_manager):
+    """Per-test database manager on the shared session pool, rolled back afterwards"""
+    return test_db_manager
+
+
+@pytest.fixture(scope="session")
+def _session_auth_manager():
+    return AsyncMock(spec=AuthSystem)
+
+
+@pytest.fixture(scope="session")
+def _session_slack_bot(_session_auth_manager):
+    bot = GooseSlackBot()
+    bot.auth_system = _session_auth_manager
+    bot.client = AsyncMock(spec_set=AsyncWebClient)
+    # Known up front so requests never call auth.test
+    bot._bot_user_id = "B123456789"
+    return bot
+
+
+@pytest.fixture
+def mock_goose_client():
+    """Fresh Goose client stub for each test"""
+    return StubGoose()
+
+
+@pytest.fixture
+def auth_manager(_session_auth_manager):
+    """Session-wide auth system mock; call history is cleared after each test"""
+    yield _session_auth_manager
+    _session_auth_manager.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture
+def slack_bot(_session_slack_bot, db_manager, mock_goose_client, auth_manager):
+    """Session-wide bot rebound to this test's database manager"""
+    bot = _session_slack_bot
+    bot.goose_client = mock_goose_client
+    bot.db_manager = db_manager
+    bot.session_repo = UserSessionRepository(db_manager)
+    bot.query_repo = QueryHistoryRepository(db_manager)
+    bot.user_repo = UserMappingRepository(db_manager)
+    bot.audit_repo = AuditLogRepository(db_manager)
+
+    yield bot
+
+    bot.client.reset_mock(return_value=True, side_effect=True)
+    bot._active_queries.clear()
+
+
+# Attributes tests re-point at their own collaborators
+_BOT_REBINDABLE = (
+    "auth_system", "goose_client", "db_manager",
+    "session_repo", "query_repo", "user_repo", "audit_repo"
+)
+
+
+@pytest.fixture
+def bot_skeleton(_session_slack_bot):
+    """Session-wide bot for tests that wire in their own collaborators
+    
+    Rebound attributes (and the formatter's inline row limit) are restored
+    after the test so nothing leaks into the next one.
+    """
+    bot = _session_slack_bot
+    saved = {name: getattr(bot, name) for name in _BOT_REBINDABLE}
+    max_inline_rows = bot.formatter.max_inline_rows
+    
+    yield bot
+    
+    for name, value in saved.items():
+        setattr(bot, name, value)
+    bot.formatter.max_inline_rows = max_inline_rows
+    bot._active_queries.clear()
+
+
+@pytest.fixture(scope="session")
+def _shared_say():
+    return AsyncMock()
+
+
+@pytest.fixture(scope="session")
+def _shared_slack_client():
+    return AsyncMock()
+
+
+@pytest.fixture
+def say_mock(_shared_say):
+    """Session-wide `say` mock, reset and answering with a message ts"""
+    _shared_say.reset_mock(return_value=True, side_effect=True)
+    _shared_say.return_value = {"ts": "1234567890.123456"}
+    return _shared_say
+
+
+@pytest.fixture
+def mock_slack_client(_shared_slack_client):
+    """Session-wide Slack Web API client mock, reset and answering chat_update"""
+    _shared_slack_client.reset_mock(return_value=True, side_effect=True)
+    _shared_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
+    return _shared_slack_client
@@ -4,25 +4,104 @@ Integration tests for complete Slack bot workflows
 
 import pytest
 import asyncio
-import json
-from unittest.mock import AsyncMock, MagicMock, patch
-from datetime import datetime, timezone
+from unittest.mock import AsyncMock
 
-from slack_bot import GooseSlackBot
 from database import (
     UserSessionRepository, QueryHistoryRepository, 
     UserMappingRepository, AuditLogRepository
 )
-from auth import AuthSystem, DatabaseAuthProvider, UserContext
-from goose_client import GooseQueryExpertClient, QueryResult, QueryStatus
+from goose_client import QueryResult, QueryStatus
 from tests import async_test
+from tests.fakes import (
+    InMemoryUserMappingRepo, InMemorySessionRepo,
+    InMemoryQueryHistoryRepo, InMemoryAuditLogRepo, StubGoose, FakeAuthSystem
+)
+
+# Keep the whole file on one xdist worker (pytest.ini uses --dist=loadgroup) so
+# the session-wide bot and mocks are built once and stay warm across its tests.
+# Everything else here is per-worker already: each worker clones its own test
+# database and the module constants below are never mutated.
+pytestmark = pytest.mark.xdist_group("full_workflow")
+
+
+def _wire_bot(bot, **collaborators):
+    """Point the shared bot at this test's auth system, Goose client and repositories"""
+    for name, value in collaborators.items():
+        setattr(bot, name, value)
+    return bot
+
+
+# Canned Goose results, built once at import and shared read-only; the bot
+# only reads QueryResult fields, so tests never need their own copy
+_NEW_USER_RESULT = QueryResult(
+    query_id="new_user_query_123",
+    sql="SELECT COUNT(*) FROM users WHERE created_at >= '2024-01-01'",
+    columns=("user_count",),
+    rows=((150,),),
+    row_count=1,
+    execution_time=0.75,
+    status=QueryStatus.COMPLETED,
+    metadata={
+        "table_search": {"tables_found": 1, "primary_table": "users"},
+        "similar_queries": {"queries_found": 3},
+        "experts": [
+            {"user_name": "data_expert", "reason": "frequent user of users table"}
+        ]
+    }
+)
+
+# Top-100 customers payload
+_LARGE_RESULT = QueryResult(
+    query_id="returning_user_query_456",
+    sql="SELECT customer_id, SUM(amount) FROM orders GROUP BY customer_id ORDER BY SUM(amount) DESC LIMIT 100",
+    columns=("customer_id", "total_amount"),
+    rows=tuple((f"cust_{i}", 1000 + i*10) for i in range(100)),
+    row_count=100,
+    execution_time=2.3,
+    status=QueryStatus.COMPLETED,
+    metadata={
+        "table_search": {"tables_found": 1},
+        "similar_queries": {"queries_found": 8},
+        "experts": [
+            {"user_name": "sales_analyst", "reason": "orders table expert"}
+        ]
+    }
+)
+
+_ERROR_RESULT = QueryResult(
+    query_id="error_query_789",
+    sql="SELECT * FROM nonexistent_table",
+    columns=(),
+    rows=(),
+    row_count=0,
+    execution_time=0.1,
+    status=QueryStatus.FAILED,
+    error_message="Table 'nonexistent_table' doesn't exist or access denied",
+    metadata={}
+)
+
+_MENTION_RESULT = QueryResult(
+    query_id="mention_query_999",
+    sql="SELECT AVG(rating) FROM reviews",
+    columns=("avg_rating",),
+    rows=((4.2,),),
+    row_count=1,
+    execution_time=0.8,
+    status=QueryStatus.COMPLETED,
+    metadata={}
+)
 
 
 class TestFullWorkflowIntegration:
-    """Test complete user interaction workflows"""
+    """Test complete user interaction workflows
+    
+    test_new_user_first_query_workflow runs against the real repositories to
+    cover the SQL path; the rest only assert on logical state and use the
+    in-memory fakes from tests.fakes.
+    """
     
     @async_test
-    async def test_new_user_first_query_workflow(self, test_db_manager):
+    async def test_new_user_first_query_workflow(self, test_db_manager, bot_skeleton, say_mock, mock_slack_client):
         """Test complete workflow for new user's first query"""
         # Setup repositories
         user_repo = UserMappingRepository(test_db_manager)
@@ -42,42 +121,21 @@ class TestFullWorkflowIntegration:
         )
         
         # Setup auth system
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
+        auth_system = FakeAuthSystem(user_repo)
         
         # Setup mock Goose client
-        mock_goose_client = AsyncMock(spec=GooseQueryExpertClient)
-        successful_result = QueryResult(
-            query_id="new_user_query_123",
-            sql="SELECT COUNT(*) FROM users WHERE created_at >= '2024-01-01'",
-            columns=["user_count"],
-            rows=[[150]],
-            row_count=1,
-            execution_time=0.75,
-            success=True,
-            metadata={
-                "table_search": {"tables_found": 1, "primary_table": "users"},
-                "similar_queries": {"queries_found": 3},
-                "experts": [
-                    {"user_name": "data_expert", "reason": "frequent user of users table"}
-                ]
-            }
-        )
-        mock_goose_client.process_user_question.return_value = successful_result
-        
-        # Setup mock Slack app
-        mock_slack_app = AsyncMock()
-        mock_slack_client = AsyncMock()
-        mock_slack_client.auth_test.return_value = {"user_id": "B123456789"}
-        mock_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
+        mock_goose_client = StubGoose()
+        mock_goose_client.result = _NEW_USER_RESULT
         
         # Create bot instance
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.goose_client = mock_goose_client
-        bot.session_repo = session_repo
-        bot.query_repo = query_repo
-        bot.audit_repo = audit_repo
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            goose_client=mock_goose_client,
+            session_repo=session_repo,
+            query_repo=query_repo,
+            audit_repo=audit_repo
+        )
         
         # Simulate Slack message event
         event = {
@@ -88,9 +146,6 @@ class TestFullWorkflowIntegration:
             "channel_type": "im"
         }
         
-        say_mock = AsyncMock()
-        say_mock.return_value = {"ts": "1234567890.123456"}
-        
         # Process the message
         await bot._process_query_request(event, say_mock, mock_slack_client)
         
@@ -106,9 +161,9 @@ class TestFullWorkflowIntegration:
         assert session["slack_user_id"] == "U123456789"
         
         # Verify query was processed
-        mock_goose_client.process_user_question.assert_called_once()
-        call_args = mock_goose_client.process_user_question.call_args
-        assert "How many users signed up this year?" in call_args[0]
+        assert len(mock_goose_client.calls) == 1
+        question, _ = mock_goose_client.calls[0]
+        assert question == "How many users signed up this year?"
         
         # Verify query was saved to history
         history = await query_repo.get_user_history("new_user", limit=1)
@@ -130,13 +185,13 @@ class TestFullWorkflowIntegration:
         assert execute_log["result"] == "success"
     
     @async_test
-    async def test_returning_user_query_workflow(self, test_db_manager):
+    async def test_returning_user_query_workflow(self, bot_skeleton, say_mock, mock_slack_client, monkeypatch):
         """Test workflow for returning user with existing session"""
         # Setup repositories
-        user_repo = UserMappingRepository(test_db_manager)
-        session_repo = UserSessionRepository(test_db_manager)
-        query_repo = QueryHistoryRepository(test_db_manager)
-        audit_repo = AuditLogRepository(test_db_manager)
+        user_repo = InMemoryUserMappingRepo()
+        session_repo = InMemorySessionRepo()
+        query_repo = InMemoryQueryHistoryRepo()
+        audit_repo = InMemoryAuditLogRepo()
         
         # Create user mapping
         await user_repo.create_or_update_mapping(
@@ -171,41 +226,23 @@ class TestFullWorkflowIntegration:
         )
         
         # Setup auth and mocks
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
-        
-        mock_goose_client = AsyncMock(spec=GooseQueryExpertClient)
-        large_result = QueryResult(
-            query_id="returning_user_query_456",
-            sql="SELECT customer_id, SUM(amount) FROM orders GROUP BY customer_id ORDER BY SUM(amount) DESC LIMIT 100",
-            columns=["customer_id", "total_amount"],
-            rows=[[f"cust_{i}", 1000 + i*10] for i in range(100)],
-            row_count=100,
-            execution_time=2.3,
-            success=True,
-            metadata={
-                "table_search": {"tables_found": 1},
-                "similar_queries": {"queries_found": 8},
-                "experts": [
-                    {"user_name": "sales_analyst", "reason": "orders table expert"}
-                ]
-            }
-        )
-        mock_goose_client.process_user_question.return_value = large_result
+        auth_system = FakeAuthSystem(user_repo)
+        
+        mock_goose_client = StubGoose()
+        mock_goose_client.result = _LARGE_RESULT
         
         # Create bot
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.goose_client = mock_goose_client
-        bot.session_repo = session_repo
-        bot.query_repo = query_repo
-        bot.audit_repo = audit_repo
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            goose_client=mock_goose_client,
+            session_repo=session_repo,
+            query_repo=query_repo,
+            audit_repo=audit_repo
+        )
         bot.formatter.max_inline_rows = 10  # Force large result handling
         
         # Mock Slack interactions
-        mock_slack_client = AsyncMock()
-        mock_slack_client.auth_test.return_value = {"user_id": "B123456789"}
-        mock_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
         mock_slack_client.files_upload_v2.return_value = {"file": {"id": "F123456"}}
         
         # Simulate query request
@@ -217,13 +254,9 @@ class TestFullWorkflowIntegration:
             "channel_type": "channel"
         }
         
-        say_mock = AsyncMock()
-        say_mock.return_value = {"ts": "1234567890.123456"}
+        monkeypatch.setattr("slack_bot.settings.enable_file_uploads", True)
         
-        with patch('slack_bot.settings') as mock_settings:
-            mock_settings.enable_file_uploads = True
-            
-            await bot._process_query_request(event, say_mock, mock_slack_client)
+        await bot._process_query_request(event, say_mock, mock_slack_client)
         
         # Verify session was reused and updated
         updated_session = await session_repo.get_session("returning_user", "C987654321")
@@ -234,7 +267,8 @@ class TestFullWorkflowIntegration:
         history = await query_repo.get_user_history("returning_user", limit=5)
         assert len(history) == 2  # Previous + new query
         
-        new_query = next(h for h in history if h["query_id"] == "returning_user_query_456")
+        new_query = await query_repo.get_query_by_id("returning_user_query_456")
+        assert new_query is not None
         assert new_query["row_count"] == 100
         assert new_query["success"] is True
         
@@ -242,22 +276,23 @@ class TestFullWorkflowIntegration:
         mock_slack_client.files_upload_v2.assert_called_once()
     
     @async_test
-    async def test_unauthorized_user_workflow(self, test_db_manager):
+    async def test_unauthorized_user_workflow(self, bot_skeleton, say_mock, mock_slack_client):
         """Test workflow for unauthorized user"""
         # Setup repositories without creating user mapping
-        user_repo = UserMappingRepository(test_db_manager)
-        session_repo = UserSessionRepository(test_db_manager)
-        audit_repo = AuditLogRepository(test_db_manager)
+        user_repo = InMemoryUserMappingRepo()
+        session_repo = InMemorySessionRepo()
+        audit_repo = InMemoryAuditLogRepo()
         
         # Setup auth system
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
+        auth_system = FakeAuthSystem(user_repo)
         
         # Create bot
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.session_repo = session_repo
-        bot.audit_repo = audit_repo
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            session_repo=session_repo,
+            audit_repo=audit_repo
+        )
         
         # Simulate unauthorized user message
         event = {
@@ -268,10 +303,7 @@ class TestFullWorkflowIntegration:
             "channel_type": "im"
         }
         
-        say_mock = AsyncMock()
-        client_mock = AsyncMock()
-        
-        await bot._process_query_request(event, say_mock, client_mock)
+        await bot._process_query_request(event, say_mock, mock_slack_client)
         
         # Verify authentication failure message was sent
         say_mock.assert_called_once()
@@ -283,13 +315,13 @@ class TestFullWorkflowIntegration:
         assert session is None
     
     @async_test
-    async def test_query_error_workflow(self, test_db_manager):
+    async def test_query_error_workflow(self, bot_skeleton, say_mock, mock_slack_client):
         """Test workflow when query execution fails"""
         # Setup user and auth
-        user_repo = UserMappingRepository(test_db_manager)
-        session_repo = UserSessionRepository(test_db_manager)
-        query_repo = QueryHistoryRepository(test_db_manager)
-        audit_repo = AuditLogRepository(test_db_manager)
+        user_repo = InMemoryUserMappingRepo()
+        session_repo = InMemorySessionRepo()
+        query_repo = InMemoryQueryHistoryRepo()
+        audit_repo = InMemoryAuditLogRepo()
         
         await user_repo.create_or_update_mapping(
             slack_user_id="U555555555",
@@ -298,36 +330,21 @@ class TestFullWorkflowIntegration:
             permissions=["query_execute"]
         )
         
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
+        auth_system = FakeAuthSystem(user_repo)
         
         # Setup mock Goose client with error result
-        mock_goose_client = AsyncMock(spec=GooseQueryExpertClient)
-        error_result = QueryResult(
-            query_id="error_query_789",
-            sql="SELECT * FROM nonexistent_table",
-            columns=[],
-            rows=[],
-            row_count=0,
-            execution_time=0.1,
-            success=False,
-            error_message="Table 'nonexistent_table' doesn't exist or access denied",
-            metadata={}
-        )
-        mock_goose_client.process_user_question.return_value = error_result
+        mock_goose_client = StubGoose()
+        mock_goose_client.result = _ERROR_RESULT
         
         # Create bot
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.goose_client = mock_goose_client
-        bot.session_repo = session_repo
-        bot.query_repo = query_repo
-        bot.audit_repo = audit_repo
-        
-        # Mock Slack client
-        mock_slack_client = AsyncMock()
-        mock_slack_client.auth_test.return_value = {"user_id": "B123456789"}
-        mock_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            goose_client=mock_goose_client,
+            session_repo=session_repo,
+            query_repo=query_repo,
+            audit_repo=audit_repo
+        )
         
         # Simulate error-prone query
         event = {
@@ -338,9 +355,6 @@ class TestFullWorkflowIntegration:
             "channel_type": "im"
         }
         
-        say_mock = AsyncMock()
-        say_mock.return_value = {"ts": "1234567890.123456"}
-        
         await bot._process_query_request(event, say_mock, mock_slack_client)
         
         # Verify error was handled gracefully
@@ -353,19 +367,17 @@ class TestFullWorkflowIntegration:
         assert "doesn't exist" in history[0]["error_message"]
         
         # Verify error was logged in audit
-        error_log = await test_db_manager.execute_one(
-            "SELECT * FROM audit_logs WHERE result = 'failure' AND user_id = 'error_user'"
-        )
+        error_log = audit_repo.find(result="failure", user_id="error_user")
         assert error_log is not None
     
     @async_test
-    async def test_concurrent_users_workflow(self, test_db_manager):
+    async def test_concurrent_users_workflow(self, bot_skeleton, mock_slack_client):
         """Test handling multiple concurrent users"""
         # Setup multiple users
-        user_repo = UserMappingRepository(test_db_manager)
-        session_repo = UserSessionRepository(test_db_manager)
-        query_repo = QueryHistoryRepository(test_db_manager)
-        audit_repo = AuditLogRepository(test_db_manager)
+        user_repo = InMemoryUserMappingRepo()
+        session_repo = InMemorySessionRepo()
+        query_repo = InMemoryQueryHistoryRepo()
+        audit_repo = InMemoryAuditLogRepo()
         
         users = [
             ("U111111111", "user1", "User One"),
@@ -374,20 +386,21 @@ class TestFullWorkflowIntegration:
         ]
         
         # Create user mappings
-        for slack_id, user_id, name in users:
-            await user_repo.create_or_update_mapping(
+        await asyncio.gather(*(
+            user_repo.create_or_update_mapping(
                 slack_user_id=slack_id,
                 internal_user_id=user_id,
                 full_name=name,
                 roles=["analyst"],
                 permissions=["query_execute"]
             )
+            for slack_id, user_id, name in users
+        ))
         
         # Setup auth and mocks
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
+        auth_system = FakeAuthSystem(user_repo)
         
-        mock_goose_client = AsyncMock(spec=GooseQueryExpertClient)
+        mock_goose_client = StubGoose()
         
         # Different results for each user
         def mock_process_question(question, user_context, progress_callback=None):
@@ -399,24 +412,21 @@ class TestFullWorkflowIntegration:
                 rows=[[hash(user_id) % 100]],
                 row_count=1,
                 execution_time=0.5,
-                success=True,
+                status=QueryStatus.COMPLETED,
                 metadata={}
             )
         
-        mock_goose_client.process_user_question.side_effect = mock_process_question
+        mock_goose_client.side_effect = mock_process_question
         
         # Create bot
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.goose_client = mock_goose_client
-        bot.session_repo = session_repo
-        bot.query_repo = query_repo
-        bot.audit_repo = audit_repo
-        
-        # Mock Slack client
-        mock_slack_client = AsyncMock()
-        mock_slack_client.auth_test.return_value = {"user_id": "B123456789"}
-        mock_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            goose_client=mock_goose_client,
+            session_repo=session_repo,
+            query_repo=query_repo,
+            audit_repo=audit_repo
+        )
         
         # Simulate concurrent requests
         async def process_user_query(slack_id, user_id, question):
@@ -448,26 +458,33 @@ class TestFullWorkflowIntegration:
         assert set(results) == {"user1", "user2", "user3"}
         
         # Verify each user has their own session and query history
-        for slack_id, user_id, _ in users:
-            channel_id = f"D{slack_id[1:]}"
-            session = await session_repo.get_session(user_id, channel_id)
+        sessions, histories = await asyncio.gather(
+            asyncio.gather(*(
+                session_repo.get_session(user_id, f"D{slack_id[1:]}")
+                for slack_id, user_id, _ in users
+            )),
+            asyncio.gather(*(
+                query_repo.get_user_history(user_id, limit=1)
+                for _, user_id, _ in users
+            ))
+        )
+        
+        for (_, user_id, _), session, history in zip(users, sessions, histories):
             assert session is not None
-            
-            history = await query_repo.get_user_history(user_id, limit=1)
             assert len(history) == 1
             assert history[0]["user_id"] == user_id
         
         # Verify Goose client was called for each user
-        assert mock_goose_client.process_user_question.call_count == 3
+        assert len(mock_goose_client.calls) == 3
     
     @async_test
-    async def test_app_mention_workflow(self, test_db_manager):
+    async def test_app_mention_workflow(self, bot_skeleton, say_mock, mock_slack_client):
         """Test app mention in channel workflow"""
         # Setup user and auth
-        user_repo = UserMappingRepository(test_db_manager)
-        session_repo = UserSessionRepository(test_db_manager)
-        query_repo = QueryHistoryRepository(test_db_manager)
-        audit_repo = AuditLogRepository(test_db_manager)
+        user_repo = InMemoryUserMappingRepo()
+        session_repo = InMemorySessionRepo()
+        query_repo = InMemoryQueryHistoryRepo()
+        audit_repo = InMemoryAuditLogRepo()
         
         await user_repo.create_or_update_mapping(
             slack_user_id="U777777777",
@@ -476,33 +493,20 @@ class TestFullWorkflowIntegration:
             permissions=["query_execute"]
         )
         
-        db_provider = DatabaseAuthProvider(user_repo)
-        auth_system = AuthSystem([db_provider])
-        
-        mock_goose_client = AsyncMock(spec=GooseQueryExpertClient)
-        mock_goose_client.process_user_question.return_value = QueryResult(
-            query_id="mention_query_999",
-            sql="SELECT AVG(rating) FROM reviews",
-            columns=["avg_rating"],
-            rows=[[4.2]],
-            row_count=1,
-            execution_time=0.8,
-            success=True,
-            metadata={}
-        )
+        auth_system = FakeAuthSystem(user_repo)
+        
+        mock_goose_client = StubGoose()
+        mock_goose_client.result = _MENTION_RESULT
         
         # Create bot
-        bot = GooseSlackBot()
-        bot.auth_system = auth_system
-        bot.goose_client = mock_goose_client
-        bot.session_repo = session_repo
-        bot.query_repo = query_repo
-        bot.audit_repo = audit_repo
-        
-        # Mock Slack client
-        mock_slack_client = AsyncMock()
-        mock_slack_client.auth_test.return_value = {"user_id": "B123456789"}
-        mock_slack_client.chat_update.return_value = {"ts": "1234567890.123457"}
+        bot = _wire_bot(
+            bot_skeleton,
+            auth_system=auth_system,
+            goose_client=mock_goose_client,
+            session_repo=session_repo,
+            query_repo=query_repo,
+            audit_repo=audit_repo
+        )
         
         # Simulate app mention event
         event = {
@@ -513,13 +517,10 @@ class TestFullWorkflowIntegration:
             "ts": "1234567890.123456"
         }
         
-        say_mock = AsyncMock()
-        say_mock.return_value = {"ts": "1234567890.123456"}
-        
         await bot._handle_mention_event(event, say_mock, mock_slack_client)
         
         # Verify mention was processed
-        mock_goose_client.process_user_question.assert_called_once()
+        assert len(mock_goose_client.calls) == 1
         
         # Verify session was created for channel
         session = await session_repo.get_session("mention_user", "C888888888")
@@ -19,7 +19,9 @@ import os
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from tests.load.load_test_runner import LoadTestConfig, TestResult, LoadTestRunner, SlackEventSimulator
+from tests.load.load_test_runner import (
+    LoadTestConfig, TestResult, LoadTestRunner, SlackEventSimulator, next_event_id
+)
 from database import get_database_manager, UserMappingRepository
 import structlog
 
@@ -192,13 +194,12 @@ class StressTestRunner(LoadTestRunner):
                     
                     # Simulate network failures if enabled
                     if self.stress_config.simulate_network_failures and self.network_simulator.should_fail():
-                        test_id = f"fail_{int(time.time() * 1000)}_{random.randint(1000, 9999)}"
-                        result = TestResult(
+                        test_id = next_event_id("fail")
+                        result = TestResult.from_timing(
                             test_id=test_id,
                             user_id=user_id,
                             start_time=time.time(),
-                            end_time=time.time(),
-                            response_time=0.0,
+                            response_ns=0,
                             success=False,
                             error_message="Simulated network failure"
                         )
@@ -319,6 +320,7 @@ class StressTestRunner(LoadTestRunner):
                 for i in range(100):  # 100 operations per worker
                     test_id = f"db_stress_{worker_id}_{i}"
                     start_time = time.time()
+                    start_ns = time.perf_counter_ns()
                     
                     try:
                         user_id = f"stress_user_{worker_id}_{i}"
@@ -351,25 +353,20 @@ class StressTestRunner(LoadTestRunner):
                                 context={"stress_test": True, "iteration": j}
                             )
                         
-                        end_time = time.time()
-                        
-                        worker_results.append(TestResult(
+                        worker_results.append(TestResult.from_timing(
                             test_id=test_id,
                             user_id=user_id,
                             start_time=start_time,
-                            end_time=end_time,
-                            response_time=end_time - start_time,
+                            response_ns=time.perf_counter_ns() - start_ns,
                             success=True
                         ))
                     
                     except Exception as e:
-                        end_time = time.time()
-                        worker_results.append(TestResult(
+                        worker_results.append(TestResult.from_timing(
                             test_id=test_id,
                             user_id=f"stress_user_{worker_id}_{i}",
                             start_time=start_time,
-                            end_time=end_time,
-                            response_time=end_time - start_time,
+                            response_ns=time.perf_counter_ns() - start_ns,
                             success=False,
                             error_message=str(e)
                         ))
@@ -0,0 +1,101 @@
+"""
+Unit tests for AuthSystem's user context cache
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from auth import AuthSystem, AuthConfig, Role
+from tests import async_test
+
+
+MAPPING = {
+    "internal_user_id": "test_user",
+    "email": "test@example.com",
+    "full_name": "Test User",
+    "roles": ["analyst"],
+    "permissions": ["query_execute"]
+}
+
+
+@pytest.fixture
+def auth_system():
+    """AuthSystem with stubbed Redis-backed collaborators"""
+    config = AuthConfig(jwt_secret="test-secret", user_cache_ttl_seconds=60, user_cache_max_size=2)
+    with patch("auth.SessionManager"):
+        system = AuthSystem(config)
+
+    system.session_manager = AsyncMock()
+    system.session_manager.create_session.return_value = "session_1"
+    system.user_mapper = AsyncMock()
+    system.user_mapper.get_mapping.return_value = MAPPING
+    return system
+
+
+class TestUserCache:
+    """Test authenticate_user caching"""
+
+    @async_test
+    async def test_hit_within_ttl_skips_lookup(self, auth_system):
+        """Test a cached user is returned without fetching the mapping again"""
+        with patch("auth.time.monotonic", return_value=100.0):
+            first = await auth_system.authenticate_user("U123")
+        with patch("auth.time.monotonic", return_value=159.0):
+            second = await auth_system.authenticate_user("U123")
+
+        assert second is first
+        auth_system.user_mapper.get_mapping.assert_awaited_once_with("U123")
+        auth_system.session_manager.create_session.assert_awaited_once()
+
+    @async_test
+    async def test_lookup_after_ttl_refetches(self, auth_system):
+        """Test an expired entry is evicted and the mapping fetched again"""
+        with patch("auth.time.monotonic", return_value=100.0):
+            first = await auth_system.authenticate_user("U123")
+        with patch("auth.time.monotonic", return_value=160.0):
+            second = await auth_system.authenticate_user("U123")
+
+        assert second is not first
+        assert auth_system.user_mapper.get_mapping.await_count == 2
+
+    @async_test
+    async def test_evicts_least_recently_used(self, auth_system):
+        """Test the cache stays within user_cache_max_size"""
+        await auth_system.authenticate_user("U1")
+        await auth_system.authenticate_user("U2")
+        # Touch U1 so U2 becomes the least recently used
+        await auth_system.authenticate_user("U1")
+        await auth_system.authenticate_user("U3")
+
+        assert list(auth_system._user_cache) == ["U1", "U3"]
+
+    @async_test
+    async def test_missing_mapping_not_cached(self, auth_system):
+        """Test unknown users are looked up every time"""
+        auth_system.user_mapper.get_mapping.return_value = None
+
+        assert await auth_system.authenticate_user("U404") is None
+        assert await auth_system.authenticate_user("U404") is None
+        assert auth_system.user_mapper.get_mapping.await_count == 2
+
+    @async_test
+    async def test_invalidate_user_clears_entry(self, auth_system):
+        """Test invalidate_user forces a fresh lookup"""
+        await auth_system.authenticate_user("U123")
+        auth_system.invalidate_user("U123")
+        await auth_system.authenticate_user("U123")
+
+        assert auth_system.user_mapper.get_mapping.await_count == 2
+
+    @async_test
+    async def test_create_user_mapping_clears_entry(self, auth_system):
+        """Test changing a user's mapping drops their cached context"""
+        await auth_system.authenticate_user("U123")
+        await auth_system.create_user_mapping(
+            slack_user_id="U123",
+            internal_user_id="test_user",
+            roles=[Role.ADMIN]
+        )
+
+        assert "U123" not in auth_system._user_cache
+        auth_system.user_mapper.create_mapping.assert_awaited_once()
@@ -3,17 +3,17 @@ Unit tests for database operations
 """
 
 import pytest
-import asyncio
+import asyncpg
 import uuid
 from datetime import datetime, timezone, timedelta
 from unittest.mock import AsyncMock, patch
-import json
 
 from database import (
     DatabaseManager, DatabaseConfig, UserSessionRepository,
-    QueryHistoryRepository, UserMappingRepository, AuditLogRepository
+    QueryHistoryRepository, UserMappingRepository, AuditLogRepository,
+    BULK_COPY_THRESHOLD
 )
-from tests import async_test
+from tests import async_test, gather_bounded
 
 
 class TestDatabaseManager:
@@ -38,6 +38,25 @@ class TestDatabaseManager:
         result = await test_db_manager.execute_scalar("SELECT 1")
         assert result == 1
     
+    @async_test
+    async def test_statement_cache_reused(self, test_db_manager):
+        """Test repeated parameterized queries are served from the statement cache"""
+        for i in range(3):
+            assert await test_db_manager.execute_scalar("SELECT $1::int", i) == i
+        
+        async with test_db_manager.pool.acquire() as conn:
+            # Pool connections are proxies; the cache lives on the raw connection
+            assert len(conn._con._stmt_cache) > 0
+    
+    @async_test
+    async def test_connection_reuses_one_backend(self, test_db_manager):
+        """Test connection() pins every call in the block to one connection"""
+        async with test_db_manager.connection() as db:
+            first_pid = await db.execute_scalar("SELECT pg_backend_pid()")
+            second_pid = await db.execute_scalar("SELECT pg_backend_pid()")
+        
+        assert first_pid == second_pid
+    
     @async_test
     async def test_connection_error_handling(self):
         """Test connection error handling"""
@@ -86,6 +105,21 @@ class TestUserSessionRepository:
         assert session["slack_user_id"] == "U123456789"
         assert session["channel_id"] == "C987654321"
     
+    @async_test
+    async def test_get_session_reuses_prepared_statement(self, test_db_manager):
+        """Test repeated session lookups bind the cached statement instead of re-parsing"""
+        repo = UserSessionRepository(test_db_manager)
+        await repo.get_session("test_user", "C987654321")
+        
+        async with test_db_manager.pool.acquire() as conn:
+            cached = len(conn._con._stmt_cache)
+        
+        for _ in range(3):
+            await repo.get_session("test_user", "C987654321")
+        
+        async with test_db_manager.pool.acquire() as conn:
+            assert len(conn._con._stmt_cache) == cached
+    
     @async_test
     async def test_update_session_activity(self, test_db_manager):
         """Test session activity update"""
@@ -106,6 +140,23 @@ class TestUserSessionRepository:
         session = await repo.get_session("test_user", "C987654321")
         assert session["context"]["updated"] is True
     
+    @async_test
+    async def test_update_session_activity_with_explicit_time(self, test_db_manager):
+        """Test session activity update stamped with a caller-supplied time"""
+        repo = UserSessionRepository(test_db_manager)
+        
+        session_id = await repo.create_session(
+            user_id="test_user",
+            slack_user_id="U123456789",
+            channel_id="C987654321"
+        )
+        
+        now = datetime(2024, 10, 1, 12, 0, tzinfo=timezone.utc)
+        await repo.update_session_activity(session_id, now=now)
+        
+        session = await repo.get_session("test_user", "C987654321")
+        assert session["last_activity"] == now
+    
     @async_test
     async def test_cleanup_inactive_sessions(self, test_db_manager):
         """Test inactive session cleanup"""
@@ -210,7 +261,70 @@ class TestQueryHistoryRepository:
         assert all(h["user_id"] == "test_user" for h in history)
     
     @async_test
-    async def test_get_popular_queries(self, test_db_manager):
+    async def test_get_query_by_id(self, test_db_manager):
+        """Test single history entry lookup by query ID"""
+        session_repo = UserSessionRepository(test_db_manager)
+        session_id = await session_repo.create_session(
+            user_id="test_user",
+            slack_user_id="U123456789",
+            channel_id="C987654321"
+        )
+        
+        query_repo = QueryHistoryRepository(test_db_manager)
+        await query_repo.save_query(
+            session_id=session_id,
+            user_id="test_user",
+            slack_user_id="U123456789",
+            channel_id="C987654321",
+            query_id="lookup_query",
+            original_question="How many orders?",
+            row_count=42,
+            success=True
+        )
+        
+        row = await query_repo.get_query_by_id("lookup_query")
+        assert row is not None
+        assert row["original_question"] == "How many orders?"
+        assert row["row_count"] == 42
+        
+        assert await query_repo.get_query_by_id("missing_query") is None
+    
+    @async_test
+    async def test_save_queries_bulk(self, test_db_manager):
+        """Test bulk query history saving on both the executemany and COPY paths"""
+        session_repo = UserSessionRepository(test_db_manager)
+        session_id = await session_repo.create_session(
+            user_id="test_user",
+            slack_user_id="U123456789",
+            channel_id="C987654321"
+        )
+        
+        query_repo = QueryHistoryRepository(test_db_manager)
+        
+        for prefix, count in (("small", 3), ("large", BULK_COPY_THRESHOLD)):
+            await query_repo.save_queries_bulk([
+                {
+                    "session_id": session_id,
+                    "user_id": "test_user",
+                    "slack_user_id": "U123456789",
+                    "channel_id": "C987654321",
+                    "query_id": f"{prefix}_query_{i}",
+                    "original_question": f"Question {i}",
+                    "generated_sql": f"SELECT {i}",
+                    "success": True,
+                    "metadata": {"experts": ["analyst"]}
+                }
+                for i in range(count)
+            ])
+        
+        saved = await test_db_manager.execute_scalar(
+            "SELECT COUNT(*) FROM query_history WHERE user_id = $1",
+            "test_user"
+        )
+        assert saved == 3 + BULK_COPY_THRESHOLD
+    
+    @async_test
+    async def test_get_popular_queries(self, test_db_manager, seed_history):
         """Test popular queries retrieval"""
         # Create session and save duplicate queries
         session_repo = UserSessionRepository(test_db_manager)
@@ -226,18 +340,12 @@ class TestQueryHistoryRepository:
         popular_question = "What is our revenue?"
         popular_sql = "SELECT SUM(amount) FROM orders"
         
-        for i in range(3):
-            await query_repo.save_query(
-                session_id=session_id,
-                user_id="test_user",
-                slack_user_id="U123456789",
-                channel_id="C987654321",
-                query_id=f"popular_query_{i}",
-                original_question=popular_question,
-                generated_sql=popular_sql,
-                success=True,
-                execution_time=1.0
-            )
+        await seed_history(
+            test_db_manager, 3, session_id,
+            query_id_prefix="popular_query",
+            original_question=popular_question,
+            generated_sql=popular_sql
+        )
         
         # Get popular queries
         popular = await query_repo.get_popular_queries(days=7, limit=5)
@@ -339,7 +447,66 @@ class TestAuditLogRepository:
         assert log["event_type"] == "query_execute"
         assert log["result"] == "success"
         assert log["resource"] == "test_query_123"
-        assert json.loads(log["event_data"])["question"] == "What is revenue?"
+        assert log["event_data"]["question"] == "What is revenue?"
+    
+    @async_test
+    async def test_buffered_events_written_on_flush(self, test_db_manager):
+        """Test buffered audit events are only written by flush()"""
+        repo = AuditLogRepository(test_db_manager)
+        
+        for action in ("query_request", "query_complete"):
+            repo.buffer_event(
+                event_type="query_execute",
+                user_id="buffered_user",
+                action=action,
+                event_data={"question": "What is revenue?"}
+            )
+        
+        count_sql = "SELECT COUNT(*) FROM audit_logs WHERE user_id = $1"
+        assert await test_db_manager.execute_scalar(count_sql, "buffered_user") == 0
+        
+        await repo.flush()
+        
+        assert await test_db_manager.execute_scalar(count_sql, "buffered_user") == 2
+        assert repo.pending == []
+    
+    @async_test
+    async def test_flush_skips_invalid_events(self, test_db_manager):
+        """Test an invalid buffered event doesn't block the rest of the batch"""
+        repo = AuditLogRepository(test_db_manager)
+        
+        repo.buffer_event(event_type="query_execute", user_id="user_a", action="query_request")
+        # user_id is NOT NULL, so this row can never be inserted
+        repo.buffer_event(event_type="query_execute", user_id=None, action="query_request")
+        repo.buffer_event(event_type="query_execute", user_id="user_b", action="query_request")
+        
+        await repo.flush()
+        assert repo.pending == []
+        
+        # Later events are written normally
+        repo.buffer_event(event_type="query_execute", user_id="user_c", action="query_request")
+        await repo.flush()
+        
+        logs = await test_db_manager.execute_query(
+            "SELECT user_id FROM audit_logs ORDER BY user_id"
+        )
+        assert [log["user_id"] for log in logs] == ["user_a", "user_b", "user_c"]
+    
+    @async_test
+    async def test_failed_flush_caps_pending_events(self, test_db_manager):
+        """Test events requeued by a failed flush() are bounded"""
+        repo = AuditLogRepository(test_db_manager)
+        repo.MAX_PENDING_EVENTS = 2
+        
+        for user_id in ("user_a", "user_b", "user_c"):
+            repo.buffer_event(event_type="query_execute", user_id=user_id, action="query_request")
+        
+        with patch.object(test_db_manager.pool, "acquire", side_effect=ConnectionError):
+            with pytest.raises(ConnectionError):
+                await repo.flush()
+        
+        # The oldest event is dropped, the newest stay queued for the next flush
+        assert [record[1] for record in repo.pending] == ["user_b", "user_c"]
     
     @async_test
     async def test_log_error_event(self, test_db_manager):
@@ -450,7 +617,7 @@ class TestDatabaseIntegration:
             )
             tasks.append(task)
         
-        session_ids = await asyncio.gather(*tasks)
+        session_ids = await gather_bounded(tasks, test_db_manager.config.max_size)
         
         # Verify all sessions were created
         assert len(session_ids) == 5
@@ -9,6 +9,7 @@ from datetime import datetime, timezone
 
 from slack_bot import SlackResultFormatter, GooseSlackBot
 from goose_client import QueryResult, QueryStatus, UserContext
+from database import AuditLogRepository
 from tests import async_test
 
 
@@ -222,7 +223,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = None
         bot.session_repo.create_session.return_value = "session_123"
@@ -259,7 +260,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = None
         bot.session_repo.create_session.return_value = "session_123"
@@ -336,7 +337,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = None
         bot.session_repo.create_session.return_value = "session_123"
@@ -361,6 +362,18 @@ class TestGooseSlackBot:
         mock_auth_system.authenticate_user.assert_called_once_with("U123456789")
         mock_goose_client.process_user_question.assert_called_once()
     
+    @async_test
+    async def test_bot_user_id_fetched_once(self):
+        """Test the bot's own user ID is looked up via auth.test only once"""
+        bot = GooseSlackBot()
+        
+        client_mock = AsyncMock()
+        client_mock.auth_test.return_value = {"user_id": "B123456789"}
+        
+        assert await bot._get_bot_user_id(client_mock) == "B123456789"
+        assert await bot._get_bot_user_id(client_mock) == "B123456789"
+        client_mock.auth_test.assert_awaited_once()
+    
     @async_test
     async def test_authenticate_user_success(self, mock_auth_system):
         """Test successful user authentication"""
@@ -397,7 +410,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = {"id": "session_123"}
         
@@ -436,10 +449,10 @@ class TestGooseSlackBot:
         bot.query_repo.save_query.assert_called_once()
         
         # Verify audit log
-        bot.audit_repo.log_event.assert_called()
+        bot.audit_repo.buffer_event.assert_called()
     
     @async_test
-    async def test_execute_user_query_large_result(self, mock_auth_system, mock_goose_client, sample_large_result):
+    async def test_execute_user_query_large_result(self, mock_auth_system, mock_goose_client, sample_large_result, monkeypatch):
         """Test query execution with large result set"""
         bot = GooseSlackBot()
         bot.auth_system = mock_auth_system
@@ -450,7 +463,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = {"id": "session_123"}
         
@@ -464,18 +477,17 @@ class TestGooseSlackBot:
         client_mock.chat_update.return_value = {"ts": "1234567890.123457"}
         client_mock.files_upload_v2.return_value = {"file": {"id": "F123456"}}
         
-        with patch('slack_bot.settings') as mock_settings:
-            mock_settings.enable_file_uploads = True
-            
-            await bot._execute_user_query(
-                "Show me all users",
-                user_context,
-                "U123456789",
-                "C987654321",
-                "1234567890.123456",
-                say_mock,
-                client_mock
-            )
+        monkeypatch.setattr("slack_bot.settings.enable_file_uploads", True)
+        
+        await bot._execute_user_query(
+            "Show me all users",
+            user_context,
+            "U123456789",
+            "C987654321",
+            "1234567890.123456",
+            say_mock,
+            client_mock
+        )
         
         # Should upload CSV file for large results
         client_mock.files_upload_v2.assert_called_once()
@@ -491,7 +503,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = {"id": "session_123"}
         
@@ -521,7 +533,7 @@ class TestGooseSlackBot:
         bot.query_repo.save_query.assert_called_once()
         
         # Should log error
-        bot.audit_repo.log_event.assert_called()
+        bot.audit_repo.buffer_event.assert_called()
     
     @async_test
     async def test_handle_slash_command(self, mock_auth_system, mock_goose_client):
@@ -533,7 +545,7 @@ class TestGooseSlackBot:
         # Mock repositories
         bot.session_repo = AsyncMock()
         bot.query_repo = AsyncMock()
-        bot.audit_repo = AsyncMock()
+        bot.audit_repo = AsyncMock(spec=AuditLogRepository)
         
         bot.session_repo.get_session.return_value = None
         bot.session_repo.create_session.return_value = "session_123"